@@ -0,0 +1,46 @@
+"""keep consumed stock lots
+
+Revision ID: 3c8f1d6e2a47
+Revises: b7d2e4a91c35
+Create Date: 2026-10-18 14:03:18.552904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c8f1d6e2a47'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e4a91c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Picks now zero lots out instead of deleting them (the inventory ledger keeps
+# pointing at them), so the FIFO index only covers lots with stock left.
+FIFO_INDEX = 'ix_stock_lots_available_fifo'
+FIFO_COLUMNS = ['product_id', 'branch_id', 'created_at', 'id']
+
+
+def _rebuild_fifo_index(where: str) -> None:
+    if not sa.inspect(op.get_bind()).has_table('stock_lots'):
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(FIFO_INDEX, table_name='stock_lots', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            FIFO_INDEX, 'stock_lots', FIFO_COLUMNS,
+            postgresql_where=sa.text(where),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _rebuild_fifo_index("status = 'AVAILABLE' AND quantity > 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _rebuild_fifo_index("status = 'AVAILABLE'")
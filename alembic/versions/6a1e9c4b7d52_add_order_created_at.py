@@ -0,0 +1,61 @@
+"""add order created_at
+
+Revision ID: 6a1e9c4b7d52
+Revises: 3c8f1d6e2a47
+Create Date: 2026-10-18 16:41:07.218336
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a1e9c4b7d52'
+down_revision: Union[str, Sequence[str], None] = '3c8f1d6e2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Order exports filter by date. Existing orders get the time of their first
+# stock lot (inbound) or PICK movement (outbound) where there is one; the
+# rest stay NULL rather than pretending they were created by this migration.
+BACKFILLS = {
+    'inbound_orders': (
+        'stock_lots',
+        "UPDATE inbound_orders SET created_at = first.created_at "
+        "FROM (SELECT inbound_order_id, MIN(created_at) AS created_at FROM stock_lots GROUP BY inbound_order_id) AS first "
+        "WHERE first.inbound_order_id = inbound_orders.id AND inbound_orders.created_at IS NULL",
+    ),
+    'outbound_orders': (
+        'inventory_movements',
+        "UPDATE outbound_orders SET created_at = first.created_at "
+        "FROM (SELECT outbound_order_id, MIN(created_at) AS created_at FROM inventory_movements "
+        "WHERE outbound_order_id IS NOT NULL GROUP BY outbound_order_id) AS first "
+        "WHERE first.outbound_order_id = outbound_orders.id AND outbound_orders.created_at IS NULL",
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table, (source, backfill) in BACKFILLS.items():
+        if not inspector.has_table(table):
+            continue
+        if 'created_at' not in {column['name'] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column('created_at', sa.DateTime(timezone=True), nullable=True))
+            op.alter_column(table, 'created_at', server_default=sa.func.now())
+        if inspector.has_table(source):
+            op.execute(backfill)
+        op.create_index(f'ix_{table}_created_at', table, ['created_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table in BACKFILLS:
+        if not inspector.has_table(table):
+            continue
+        op.drop_index(f'ix_{table}_created_at', table_name=table, if_exists=True)
+        op.drop_column(table, 'created_at')
@@ -0,0 +1,52 @@
+"""add stock lot indexes
+
+Revision ID: b7d2e4a91c35
+Revises: 455bb0f4b1f7
+Create Date: 2026-10-18 10:12:44.301527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4a91c35'
+down_revision: Union[str, Sequence[str], None] = '455bb0f4b1f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Enum columns store member names, hence the upper-case literals.
+INDEXES = [
+    ('ix_stock_lots_available_fifo', ['product_id', 'branch_id', 'created_at', 'id'], "status = 'AVAILABLE'"),
+    ('ix_stock_lots_pending_branch', ['branch_id', 'created_at', 'id'], "status = 'PENDING'"),
+    ('ix_stock_lots_pending', ['created_at', 'id'], "status = 'PENDING'"),
+    ('ix_stock_lots_inbound_order_id', ['inbound_order_id'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # stock_lots is created by app/initial_data.py (create_all), which already
+    # builds these indexes from the model; this brings older databases up to date.
+    if not sa.inspect(op.get_bind()).has_table('stock_lots'):
+        return
+    # CONCURRENTLY keeps picks and inspections running while the indexes build.
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name, 'stock_lots', columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('stock_lots'):
+        return
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='stock_lots', postgresql_concurrently=True, if_exists=True)
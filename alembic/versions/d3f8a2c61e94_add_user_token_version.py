@@ -0,0 +1,40 @@
+"""add user token_version
+
+Revision ID: d3f8a2c61e94
+Revises: 6a1e9c4b7d52
+Create Date: 2026-10-18 18:05:32.614209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f8a2c61e94'
+down_revision: Union[str, Sequence[str], None] = '6a1e9c4b7d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def has_token_version() -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(column['name'] == 'token_version' for column in inspector.get_columns('users'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # users is created by app/initial_data.py (create_all), which already has the
+    # column; this brings older databases up to date. Existing users start at 0,
+    # so tokens issued before the upgrade stay valid.
+    if not sa.inspect(op.get_bind()).has_table('users') or has_token_version():
+        return
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('users') or not has_token_version():
+        return
+    op.drop_column('users', 'token_version')
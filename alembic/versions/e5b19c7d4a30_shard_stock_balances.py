@@ -0,0 +1,60 @@
+"""shard stock_balances
+
+Revision ID: e5b19c7d4a30
+Revises: d3f8a2c61e94
+Create Date: 2026-10-18 19:12:44.208371
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b19c7d4a30'
+down_revision: Union[str, Sequence[str], None] = 'd3f8a2c61e94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRIMARY_KEY = 'stock_balances_pkey'
+KEY_COLUMNS = ['product_id', 'branch_id', 'status']
+
+
+def has_shard() -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(column['name'] == 'shard' for column in inspector.get_columns('stock_balances'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # stock_balances is created by app/initial_data.py (create_all), which already
+    # has the column; this brings older databases up to date. Existing balances
+    # become shard 0, so their sums do not change.
+    if not sa.inspect(op.get_bind()).has_table('stock_balances') or has_shard():
+        return
+    op.add_column('stock_balances', sa.Column('shard', sa.Integer(), server_default='0', nullable=False))
+    op.drop_constraint(PRIMARY_KEY, 'stock_balances', type_='primary')
+    op.create_primary_key(PRIMARY_KEY, 'stock_balances', KEY_COLUMNS + ['shard'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table('stock_balances') or not has_shard():
+        return
+    # Fold every other shard into shard 0 before the column goes away.
+    op.execute("""
+        WITH folded AS (
+            DELETE FROM stock_balances WHERE shard <> 0
+            RETURNING product_id, branch_id, status, quantity
+        )
+        INSERT INTO stock_balances (product_id, branch_id, status, shard, quantity)
+        SELECT product_id, branch_id, status, 0, SUM(quantity)
+        FROM folded
+        GROUP BY product_id, branch_id, status
+        ON CONFLICT (product_id, branch_id, status, shard)
+        DO UPDATE SET quantity = stock_balances.quantity + EXCLUDED.quantity
+    """)
+    op.drop_constraint(PRIMARY_KEY, 'stock_balances', type_='primary')
+    op.drop_column('stock_balances', 'shard')
+    op.create_primary_key(PRIMARY_KEY, 'stock_balances', KEY_COLUMNS)
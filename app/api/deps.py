@@ -1,13 +1,28 @@
+import os
+from typing import Any, Callable, Optional
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
 from jose import JWTError, jwt
 
 from app.core import models, schemas, security
-from app.core.database import SessionLocal
+from app.core.cache import TTLCache
+from app.core.database import AsyncSessionLocal, SessionLocal
+from app.core.token_versions import token_versions
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+# Authenticated principals keyed by token subject (email). Entries are dropped
+# when the user is updated; the TTL bounds staleness across worker processes.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60")),
+)
+
 # --- Database Dependency ---
 
 def get_db():
@@ -20,15 +35,58 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    Dependency to get an async database session (asyncpg).
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_sync_endpoint(
+    db: AsyncSession, endpoint: Callable, response_model: Any, **kwargs
+):
+    """
+    Runs a sync endpoint against an async session. The body executes on the
+    session's asyncpg connection through `run_sync` (no thread is held while
+    waiting on the database) and the result is serialized before returning,
+    so no lazy load is attempted outside of it.
+    """
+    def call(session: Session):
+        result = endpoint(db=session, **kwargs)
+        return TypeAdapter(response_model).validate_python(result, from_attributes=True)
+
+    return await db.run_sync(call)
+
 # --- Authentication & Authorization Dependencies ---
 
 def get_user_by_email(db: Session, email: str):
     """Helper to get user from database."""
     return db.query(models.User).filter(models.User.email == email).first()
 
+def get_principal(db: Session, email: str) -> Optional[schemas.Principal]:
+    """
+    Returns the cached principal for a token subject, loading the user and
+    their branch ids in a single query on a cache miss.
+    """
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = db.query(models.User).options(joinedload(models.User.branches)).filter(
+            models.User.email == email
+        ).first()
+        if user is None:
+            return None
+        principal = schemas.Principal.model_validate(user)
+        principal_cache.set(email, principal)
+    return principal
+
+def invalidate_principal(*emails: str):
+    """Drops cached principals; call after changing a user's data."""
+    for email in emails:
+        principal_cache.pop(email)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
+) -> schemas.Principal:
     """
     Decodes the JWT token to get the current user.
     Raises credentials exception if token is invalid.
@@ -47,14 +105,33 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = get_user_by_email(db, email=token_data.email)
-    if user is None:
+    # Fast path: the token carries the principal and its version is still current.
+    claimed = security.principal_from_claims(payload)
+    if claimed is not None:
+        known_version = token_versions.get(claimed.id)
+        if known_version == claimed.token_version:
+            return claimed
+        if known_version is not None and known_version > claimed.token_version:
+            # Revoked by a password or profile change, possibly on another worker
+            # whose bump this worker's cached principal may not reflect yet.
+            raise credentials_exception
+
+    # Cache misses query the database; keep that off the event loop.
+    principal = await run_in_threadpool(get_principal, db, token_data.email)
+    if principal is None:
         raise credentials_exception
-    return user
+    if claimed is not None and claimed.token_version != principal.token_version:
+        # This worker may have cached the principal before the change that issued
+        # the token; only a mismatch with the fresh row means it was revoked.
+        invalidate_principal(token_data.email)
+        principal = await run_in_threadpool(get_principal, db, token_data.email)
+        if principal is None or claimed.token_version != principal.token_version:
+            raise credentials_exception # Revoked by a password or profile change
+    return principal
 
 async def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: schemas.Principal = Depends(get_current_user),
+) -> schemas.Principal:
     """
     Gets the current user and checks if they are active.
     """
@@ -63,8 +140,8 @@ async def get_current_active_user(
     return current_user
 
 async def get_current_admin_user(
-    current_user: models.User = Depends(get_current_active_user),
-) -> models.User:
+    current_user: schemas.Principal = Depends(get_current_active_user),
+) -> schemas.Principal:
     """
     Gets the current active user and checks if they are an ADMIN.
     Raises an exception if the user is not an admin.
@@ -78,7 +155,7 @@ async def get_current_admin_user(
 
 # --- Branch Access Dependency ---
 
-def check_branch_access(user: models.User, branch_id: int):
+def check_branch_access(user: schemas.Principal, branch_id: int):
     """
     Checks if a user has access to a specific branch.
     - Admins have access to all branches.
@@ -87,8 +164,7 @@ def check_branch_access(user: models.User, branch_id: int):
     if user.profile == models.UserProfile.ADMIN:
         return True
     
-    user_branch_ids = {branch.id for branch in user.branches}
-    if branch_id not in user_branch_ids:
+    if branch_id not in user.branch_ids:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have access to this branch's resources."
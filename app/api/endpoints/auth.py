@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload
 
 from app.core import models, schemas, security
 from app.api import deps
@@ -8,28 +9,56 @@ from app.api import deps
 router = APIRouter()
 
 
+def get_login_candidate(db: Session, email: str):
+    """Loads the stored hash and the token principal of a user in one query."""
+    user = db.query(models.User).options(joinedload(models.User.branches)).filter(
+        models.User.email == email
+    ).first()
+    if user is None:
+        return None, None
+    return user.hashed_password, schemas.Principal.model_validate(user)
+
+
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     db: Session = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     Authenticates a user and returns a JWT access token.
+    - The user lookup runs on the threadpool and bcrypt on the bounded
+      password pool, so the event loop is never blocked.
+    - Returns 503 when the password pool is saturated.
     """
-    user = deps.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    hashed_password, principal = await run_in_threadpool(get_login_candidate, db, form_data.username)
+    try:
+        password_ok = principal is not None and await security.verify_password_async(
+            form_data.password, hashed_password
+        )
+    except security.PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": "1"},
+        )
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = security.create_access_token(data={"sub": user.email})
+    access_token = security.create_access_token(data=security.principal_claims(principal))
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/users/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(deps.get_current_active_user)):
+def read_users_me(
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
     """
     Fetches the profile of the currently logged-in user.
     """
-    return current_user
+    return db.query(models.User).options(joinedload(models.User.branches)).filter(
+        models.User.id == current_user.id
+    ).first()
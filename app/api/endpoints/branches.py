@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from app.core import models, schemas
+from app.core import models, reference_data, schemas
 from app.api import deps
 
 router = APIRouter()
@@ -13,7 +13,7 @@ router = APIRouter()
 def create_branch(
     branch_in: schemas.BranchCreate,
     db: Session = Depends(deps.get_db),
-    current_admin: models.User = Depends(deps.get_current_admin_user)
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
 ):
     """
     Creates a new branch. Only accessible by admin users.
@@ -35,7 +35,7 @@ def read_branches(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user) # Any active user can see branches
+    current_user: schemas.Principal = Depends(deps.get_current_active_user) # Any active user can see branches
 ):
     """
     Lists all branches.
@@ -47,12 +47,12 @@ def read_branches(
 def read_branch(
     branch_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
 ):
     """
-    Gets a specific branch by ID.
+    Gets a specific branch by ID (served from the reference data cache).
     """
-    branch = db.query(models.Branch).filter(models.Branch.id == branch_id).first()
+    branch = reference_data.get_branch(db, branch_id)
     if branch is None:
         raise HTTPException(status_code=404, detail="Branch not found")
     return branch
@@ -62,7 +62,7 @@ def update_branch(
     branch_id: int,
     branch_in: schemas.BranchUpdate,
     db: Session = Depends(deps.get_db),
-    current_admin: models.User = Depends(deps.get_current_admin_user)
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
 ):
     """
     Updates a branch. Only accessible by admin users.
@@ -77,6 +77,7 @@ def update_branch(
 
     db.add(branch)
     db.commit()
+    reference_data.branch_cache.invalidate(branch_id)
     db.refresh(branch)
     return branch
 
@@ -84,7 +85,7 @@ def update_branch(
 def delete_branch(
     branch_id: int,
     db: Session = Depends(deps.get_db),
-    current_admin: models.User = Depends(deps.get_current_admin_user)
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
 ):
     """
     Deletes a branch. Only accessible by admin users.
@@ -95,4 +96,5 @@ def delete_branch(
     
     db.delete(branch)
     db.commit()
+    reference_data.branch_cache.invalidate(branch_id)
     return 
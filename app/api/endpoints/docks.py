@@ -1,10 +1,10 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 
 from app import crud
-from app.api import deps
+from app.api import deps, pagination
 from app.schemas.dock import Dock, DockCreate, DockUpdate
 
 router = APIRouter()
@@ -12,12 +12,15 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Dock])
 def read_docks(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
 ) -> List[Dock]:
-    """Retrieve docks."""
-    docks = crud.dock.get_docks(db, skip=skip, limit=limit)
+    """Retrieve docks. Pass the X-Next-Cursor header back as `cursor` for the next page."""
+    docks = crud.dock.get_docks(db, skip=skip, limit=limit, after_id=pagination.decode_id_cursor(cursor))
+    pagination.set_next_cursor(response, pagination.next_id_cursor(docks, limit))
     return docks
 
 
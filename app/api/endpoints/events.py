@@ -0,0 +1,66 @@
+import asyncio
+import json
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+
+from app.core import events, models, schemas
+from app.api import deps
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+def format_event(event_type: str, data: dict) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+async def stream_events(request: Request, subscription: events.Subscription):
+    """Yields the subscription's events as SSE frames, with a comment line as keepalive."""
+    try:
+        yield "retry: 5000\n\n"
+        reported_drops = 0
+        while True:
+            try:
+                stock_event = await asyncio.wait_for(subscription.queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            if subscription.dropped != reported_drops:
+                # The client fell behind and lost events; it should reload its view.
+                yield format_event("stream.overflow", {"dropped": subscription.dropped - reported_drops})
+                reported_drops = subscription.dropped
+            yield format_event(stock_event["type"], stock_event)
+    finally:
+        events.broker.unsubscribe(subscription)
+
+@router.get("/events/stream")
+async def stream_stock_events(
+    request: Request,
+    branch_id: Optional[int] = None,
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Server-sent events for stock lot changes, for live dashboards:
+    `lot.created`, `lot.inspected` and `lot.consumed`, each sent once its
+    transaction has committed.
+    - Streams one branch, or every branch the user can access.
+    - Admins without `branch_id` receive all branches.
+    """
+    if branch_id is not None:
+        deps.check_branch_access(current_user, branch_id)
+        branch_ids = [branch_id]
+    elif current_user.profile == models.UserProfile.ADMIN:
+        branch_ids = None
+    else:
+        branch_ids = sorted(current_user.branch_ids)
+
+    subscription = events.broker.subscribe(branch_ids)
+    return StreamingResponse(
+        stream_events(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,173 @@
+import csv
+import enum
+import io
+import json
+import os
+from datetime import datetime
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from app.core import models, schemas
+from app.core.database import SessionLocal
+from app.api import deps
+
+router = APIRouter()
+
+# Rows fetched per round trip from the server-side cursor; memory stays
+# bounded by one chunk whatever the size of the export.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+MEDIA_TYPES = {
+    schemas.ExportFormat.CSV: "text/csv",
+    schemas.ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+def export_value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def stream_rows(stmt: Select, export_format: schemas.ExportFormat) -> Iterator[str]:
+    """
+    Runs `stmt` on its own session with a server-side cursor and yields the
+    rows encoded as CSV (with a header line) or NDJSON, one chunk at a time.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt, execution_options={"yield_per": EXPORT_CHUNK_SIZE})
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == schemas.ExportFormat.CSV:
+            writer.writerow(columns)
+        for rows in result.partitions():
+            for row in rows:
+                values = [export_value(value) for value in row]
+                if export_format == schemas.ExportFormat.CSV:
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values)), separators=(",", ":")))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+def export_response(stmt: Select, export_format: schemas.ExportFormat, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(stmt, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format.value}"'},
+    )
+
+def scope_export(
+    stmt: Select,
+    branch_column,
+    created_at_column,
+    current_user: schemas.Principal,
+    branch_id: Optional[int],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+) -> Select:
+    """Applies the branch (and branch access) and [created_from, created_to) filters."""
+    if branch_id is not None:
+        deps.check_branch_access(current_user, branch_id)
+        stmt = stmt.where(branch_column == branch_id)
+    elif current_user.profile != models.UserProfile.ADMIN:
+        stmt = stmt.where(branch_column.in_(sorted(current_user.branch_ids)))
+    if created_from is not None:
+        stmt = stmt.where(created_at_column >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(created_at_column < created_to)
+    return stmt
+
+@router.get("/exports/inbound-orders")
+def export_inbound_orders(
+    export_format: schemas.ExportFormat = Query(schemas.ExportFormat.CSV, alias="format"),
+    branch_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Streams inbound orders as CSV or NDJSON, oldest first, for BI extracts.
+    - Filters by branch and by creation time (`created_from` inclusive, `created_to` exclusive).
+    - Admins export all branches, others only their own.
+    """
+    order = models.InboundOrder
+    stmt = (
+        select(
+            order.id, order.created_at, order.branch_id, models.Branch.name.label("branch_name"),
+            order.product_id, models.Product.name.label("product_name"), order.quantity,
+            order.user_id, models.User.email.label("user_email"),
+        )
+        .join(models.Branch, models.Branch.id == order.branch_id)
+        .join(models.Product, models.Product.id == order.product_id)
+        .join(models.User, models.User.id == order.user_id)
+        .order_by(order.created_at, order.id)
+    )
+    stmt = scope_export(stmt, order.branch_id, order.created_at, current_user, branch_id, created_from, created_to)
+    return export_response(stmt, export_format, "inbound_orders")
+
+@router.get("/exports/outbound-orders")
+def export_outbound_orders(
+    export_format: schemas.ExportFormat = Query(schemas.ExportFormat.CSV, alias="format"),
+    branch_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Streams outbound orders as CSV or NDJSON, oldest first, for BI extracts.
+    - Filters by branch and by creation time (`created_from` inclusive, `created_to` exclusive).
+    - Admins export all branches, others only their own.
+    """
+    order = models.OutboundOrder
+    stmt = (
+        select(
+            order.id, order.created_at, order.branch_id, models.Branch.name.label("branch_name"),
+            order.product_id, models.Product.name.label("product_name"), order.quantity,
+            order.user_id, models.User.email.label("user_email"),
+        )
+        .join(models.Branch, models.Branch.id == order.branch_id)
+        .outerjoin(models.Product, models.Product.id == order.product_id)
+        .outerjoin(models.User, models.User.id == order.user_id)
+        .order_by(order.created_at, order.id)
+    )
+    stmt = scope_export(stmt, order.branch_id, order.created_at, current_user, branch_id, created_from, created_to)
+    return export_response(stmt, export_format, "outbound_orders")
+
+@router.get("/exports/stock-lot-history")
+def export_stock_lot_history(
+    export_format: schemas.ExportFormat = Query(schemas.ExportFormat.CSV, alias="format"),
+    branch_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Streams the inventory ledger (every receipt, inspection, adjustment and
+    pick of each stock lot) as CSV or NDJSON, oldest first.
+    - Filters by branch and by movement time (`created_from` inclusive, `created_to` exclusive).
+    - Admins export all branches, others only their own.
+    """
+    movement = models.InventoryMovement
+    stmt = (
+        select(
+            movement.id, movement.created_at, movement.movement_type, movement.stock_lot_id,
+            movement.branch_id, movement.product_id, models.Product.name.label("product_name"),
+            movement.status, movement.quantity, movement.outbound_order_id, movement.user_id,
+        )
+        .join(models.Product, models.Product.id == movement.product_id)
+        .order_by(movement.created_at, movement.id)
+    )
+    stmt = scope_export(stmt, movement.branch_id, movement.created_at, current_user, branch_id, created_from, created_to)
+    return export_response(stmt, export_format, "stock_lot_history")
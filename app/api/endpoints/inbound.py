@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import List, Optional
 
-from app.core import models, schemas
-from app.api import deps
+from app.core import events, ledger, models, reference_data, schemas
+from app.api import deps, pagination
 
 router = APIRouter()
 
@@ -11,18 +12,14 @@ router = APIRouter()
 def create_inbound_order(
     order_in: schemas.InboundOrderCreate,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Create an inbound order, which in turn creates a stock lot in PENDING status.
     """
     deps.check_branch_access(current_user, order_in.branch_id)
 
-    db_product = db.query(models.Product).filter(
-        models.Product.id == order_in.product_id,
-        models.Product.branch_id == order_in.branch_id
-    ).first()
-    
+    db_product = reference_data.get_branch_product(db, order_in.product_id, order_in.branch_id)
     if not db_product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -37,8 +34,7 @@ def create_inbound_order(
         branch_id=order_in.branch_id
     )
     db.add(db_inbound_order)
-    db.commit()
-    db.refresh(db_inbound_order)
+    db.flush() # Assigns the order id without ending the transaction
 
     # 2. Create the corresponding StockLot in PENDING status
     db_stock_lot = models.StockLot(
@@ -50,17 +46,126 @@ def create_inbound_order(
         created_by_user_id=current_user.id
     )
     db.add(db_stock_lot)
+    db.flush()
+
+    # 3. Record the receipt in the inventory ledger
+    ledger.record(db, [ledger.movement(
+        models.MovementType.RECEIPT, db_stock_lot.id, order_in.product_id, order_in.branch_id,
+        models.StockLotStatus.PENDING, order_in.quantity, user_id=current_user.id,
+    )])
+    events.emit(db, [events.lot_event(
+        events.LOT_CREATED, order_in.branch_id, db_stock_lot.id, order_in.product_id,
+        status=models.StockLotStatus.PENDING.value, quantity=order_in.quantity,
+        inbound_order_id=db_inbound_order.id,
+    )])
     db.commit()
     db.refresh(db_inbound_order) # Refresh to load the new stock lot relationship
 
     return db_inbound_order
 
+@router.post("/inbound/orders/batch", response_model=schemas.InboundBatchResult)
+def create_inbound_orders_batch(
+    batch_in: schemas.InboundBatchCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Receives many lines for a branch at once, e.g. a full truck.
+    - Creates one inbound order and one PENDING stock lot per line.
+    - Products are validated in one query (or from the cache) and rows are inserted in multi-row
+      batches within a single transaction: either every line is received or none is.
+    """
+    deps.check_branch_access(current_user, batch_in.branch_id)
+
+    if not batch_in.lines:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The batch has no lines")
+    if any(line.quantity <= 0 for line in batch_in.lines):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Line quantities must be positive")
+
+    # 1. Verify every product exists in the branch
+    product_ids = {line.product_id for line in batch_in.lines}
+    found_ids = reference_data.find_branch_products(db, product_ids, batch_in.branch_id)
+    missing_ids = sorted(product_ids - found_ids)
+    if missing_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found in the specified branch: {missing_ids}"
+        )
+
+    # 2. Create the InboundOrder records
+    inbound_orders = models.InboundOrder.__table__
+    order_ids = db.scalars(
+        insert(inbound_orders).returning(inbound_orders.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "user_id": current_user.id,
+                "branch_id": batch_in.branch_id,
+            }
+            for line in batch_in.lines
+        ],
+    ).all()
+
+    # 3. Create the corresponding StockLots in PENDING status
+    stock_lots = models.StockLot.__table__
+    lot_ids = db.scalars(
+        insert(stock_lots).returning(stock_lots.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "product_id": line.product_id,
+                "branch_id": batch_in.branch_id,
+                "inbound_order_id": order_id,
+                "quantity": line.quantity,
+                "status": models.StockLotStatus.PENDING,
+                "created_by_user_id": current_user.id,
+            }
+            for line, order_id in zip(batch_in.lines, order_ids)
+        ],
+    ).all()
+
+    # 4. Record the receipts in the inventory ledger
+    ledger.record(db, [
+        ledger.movement(
+            models.MovementType.RECEIPT, lot_id, line.product_id, batch_in.branch_id,
+            models.StockLotStatus.PENDING, line.quantity, user_id=current_user.id,
+        )
+        for line, lot_id in zip(batch_in.lines, lot_ids)
+    ])
+    events.emit(db, [
+        events.lot_event(
+            events.LOT_CREATED, batch_in.branch_id, lot_id, line.product_id,
+            status=models.StockLotStatus.PENDING.value, quantity=line.quantity,
+            inbound_order_id=order_id,
+        )
+        for line, order_id, lot_id in zip(batch_in.lines, order_ids, lot_ids)
+    ])
+
+    # 5. Commit the whole batch at once
+    db.commit()
+
+    return schemas.InboundBatchResult(
+        branch_id=batch_in.branch_id,
+        lines=[
+            schemas.InboundBatchLineResult(
+                line=position,
+                product_id=line.product_id,
+                quantity=line.quantity,
+                inbound_order_id=order_id,
+                stock_lot_id=lot_id,
+            )
+            for position, (line, order_id, lot_id) in enumerate(zip(batch_in.lines, order_ids, lot_ids))
+        ],
+    )
+
 @router.get("/inbound/orders", response_model=List[schemas.InboundOrder])
 def read_inbound_orders(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Retrieve inbound orders. Admins see all, others see from their branches.
@@ -74,19 +179,20 @@ def read_inbound_orders(
     )
 
     if current_user.profile != models.UserProfile.ADMIN:
-        user_branch_ids = {branch.id for branch in current_user.branches}
+        user_branch_ids = current_user.branch_ids
         if not user_branch_ids:
             return []
         query = query.filter(models.InboundOrder.branch_id.in_(user_branch_ids))
 
-    orders = query.order_by(models.InboundOrder.id.desc()).offset(skip).limit(limit).all()
+    orders, next_cursor = pagination.paginate_by_id(query, models.InboundOrder.id, cursor, skip, limit, descending=True)
+    pagination.set_next_cursor(response, next_cursor)
     return orders
 
 @router.get("/inbound/orders/{order_id}", response_model=schemas.InboundOrder)
 def read_inbound_order(
     order_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Retrieve a specific inbound order by ID, with its stock lots.
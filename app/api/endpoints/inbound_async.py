@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core import schemas
+from app.api import deps
+from app.api.endpoints import inbound
+
+# Async twins of the inbound routes, enabled with WMS_ASYNC_ROUTERS=inbound.
+# Each one runs the sync implementation on an asyncpg session via run_sync.
+router = APIRouter()
+
+@router.post("/inbound/orders", response_model=schemas.InboundOrder)
+async def create_inbound_order(
+    order_in: schemas.InboundOrderCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Create an inbound order, which in turn creates a stock lot in PENDING status.
+    """
+    return await deps.run_sync_endpoint(
+        db, inbound.create_inbound_order, schemas.InboundOrder,
+        order_in=order_in, current_user=current_user,
+    )
+
+@router.post("/inbound/orders/batch", response_model=schemas.InboundBatchResult)
+async def create_inbound_orders_batch(
+    batch_in: schemas.InboundBatchCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Receives many lines for a branch at once, in a single transaction.
+    """
+    return await deps.run_sync_endpoint(
+        db, inbound.create_inbound_orders_batch, schemas.InboundBatchResult,
+        batch_in=batch_in, current_user=current_user,
+    )
+
+@router.get("/inbound/orders", response_model=List[schemas.InboundOrder])
+async def read_inbound_orders(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Retrieve inbound orders. Admins see all, others see from their branches.
+    """
+    return await deps.run_sync_endpoint(
+        db, inbound.read_inbound_orders, List[schemas.InboundOrder],
+        response=response, skip=skip, limit=limit, cursor=cursor, current_user=current_user,
+    )
+
+@router.get("/inbound/orders/{order_id}", response_model=schemas.InboundOrder)
+async def read_inbound_order(
+    order_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Retrieve a specific inbound order by ID, with its stock lots.
+    """
+    return await deps.run_sync_endpoint(
+        db, inbound.read_inbound_order, schemas.InboundOrder,
+        order_id=order_id, current_user=current_user,
+    )
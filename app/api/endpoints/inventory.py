@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.core import ledger, models, schemas, snapshots
+from app.api import deps
+
+router = APIRouter()
+
+@router.get("/inventory/as-of", response_model=schemas.InventoryAsOf)
+def read_inventory_as_of(
+    at: datetime,
+    branch_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Stock per branch, product and status at a past moment (e.g. month-end).
+    - Starts from the nearest snapshot taken before `at` and adds the ledger movements after it.
+    - Admins see all branches, others only their own.
+    """
+    branch_ids = None
+    if branch_id is not None:
+        deps.check_branch_access(current_user, branch_id)
+        branch_ids = [branch_id]
+    elif current_user.profile != models.UserProfile.ADMIN:
+        branch_ids = sorted(current_user.branch_ids)
+
+    snapshot, lines = snapshots.stock_as_of(db, at, branch_ids=branch_ids, product_id=product_id)
+    return schemas.InventoryAsOf(
+        as_of=at,
+        snapshot_id=snapshot.id if snapshot else None,
+        snapshot_taken_at=snapshot.taken_at if snapshot else None,
+        lines=lines,
+    )
+
+@router.post("/inventory/snapshots", response_model=schemas.InventorySnapshot)
+def create_inventory_snapshot(
+    db: Session = Depends(deps.get_db),
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user),
+):
+    """
+    Takes an inventory snapshot now, e.g. right at a period close. Admin only.
+    """
+    snapshot = ledger.take_snapshot(db)
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
@@ -0,0 +1,135 @@
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from app.core import events, instrumentation, schemas, security, slow_queries
+from app.core.cache import reference_caches
+from app.core.database import async_engine, engine
+from app.core.pool_metrics import pool_status
+from app.api import deps
+
+router = APIRouter()
+
+# Served at the root (/metrics) for Prometheus scrapers, which do not log in.
+# Set METRICS_TOKEN to require `Authorization: Bearer <token>` on it.
+prometheus_router = APIRouter()
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@router.get("/metrics/password-hashing")
+def read_password_hashing_metrics(
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
+):
+    """
+    Queue depth and throughput of the bounded password hashing pool. Admin only.
+    """
+    return security.password_pool.stats()
+
+@router.get("/metrics/db-pool")
+def read_db_pool_metrics(
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
+):
+    """
+    Connection pool occupancy (in use, overflow) and checkout wait times of the
+    sync and async engines. Admin only.
+    """
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine.sync_engine),
+    }
+
+@router.get("/metrics/slow-queries")
+def read_slow_queries(
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
+):
+    """
+    The most recent slow statements (newest first), with their route, normalized
+    SQL, redacted parameters and, for sampled SELECTs, the EXPLAIN (ANALYZE,
+    BUFFERS) plan. Empty unless SLOW_QUERY_MS is set. Admin only.
+    """
+    return {
+        "threshold_ms": slow_queries.SLOW_QUERY_MS,
+        **slow_queries.slow_query_log.stats(),
+        "entries": slow_queries.slow_query_log.entries(),
+    }
+
+def cache_stats() -> dict:
+    """Counters of every reference data cache and of the principal cache, by name."""
+    stats = {name: cache.stats() for name, cache in sorted(reference_caches.items())}
+    stats["principals"] = {"backend": "lru", **deps.principal_cache.stats()}
+    return stats
+
+@router.get("/metrics/caches")
+def read_cache_metrics(
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
+):
+    """
+    Hits, misses, evictions, invalidations and size of the reference data caches
+    (branches, branch products) and the principal cache. Admin only.
+    """
+    return cache_stats()
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse)
+def read_prometheus_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Per-route latency histograms, SQL statement counts and time, N+1 suspects,
+    connection pool, password hashing pool and cache state, in the Prometheus text format.
+    """
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+
+    lines = instrumentation.request_metrics.render()
+
+    pools = {"sync": pool_status(engine), "async": pool_status(async_engine.sync_engine)}
+    for field in ("size", "in_use", "checked_in", "overflow"):
+        instrumentation.render_gauge(
+            lines, f"wms_db_pool_{field}", f"Connection pool {field.replace('_', ' ')}.",
+            {(name,): pool[field] for name, pool in pools.items() if field in pool}, ("engine",),
+        )
+    waits = {name: pool["checkout_wait"] for name, pool in pools.items() if "checkout_wait" in pool}
+    instrumentation.render_counter(
+        lines, "wms_db_pool_checkouts_total", "Connection checkouts.",
+        {(name,): wait["checkouts"] for name, wait in waits.items()}, ("engine",),
+    )
+    instrumentation.render_counter(
+        lines, "wms_db_pool_checkout_wait_seconds_total", "Time spent waiting for a pooled connection.",
+        {(name,): wait["total_wait_seconds"] for name, wait in waits.items()}, ("engine",),
+    )
+    instrumentation.render_counter(
+        lines, "wms_db_pool_checkout_timeouts_total", "Checkouts that timed out.",
+        {(name,): wait["timeouts"] for name, wait in waits.items()}, ("engine",),
+    )
+
+    hashing = security.password_pool.stats()
+    for field in ("workers", "running", "queued"):
+        instrumentation.render_gauge(lines, f"wms_password_hash_{field}", f"Password hashing pool {field}.", {(): hashing[field]})
+    for field in ("completed", "rejected"):
+        instrumentation.render_counter(
+            lines, f"wms_password_hash_{field}_total", f"Password hashing jobs {field}.", {(): hashing[field]}, (),
+        )
+
+    instrumentation.render_counter(
+        lines, "wms_db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.",
+        {(): slow_queries.slow_query_log.recorded}, (),
+    )
+
+    caches = cache_stats()
+    for field in ("hits", "misses", "evictions", "invalidations", "errors"):
+        instrumentation.render_counter(
+            lines, f"wms_cache_{field}_total", f"Cache {field}.",
+            {(name,): cache[field] for name, cache in caches.items() if field in cache}, ("cache",),
+        )
+    instrumentation.render_gauge(
+        lines, "wms_cache_entries", "Entries held by in-process caches.",
+        {(name,): cache["size"] for name, cache in caches.items() if "size" in cache}, ("cache",),
+    )
+
+    subscribers = events.broker.stats()
+    instrumentation.render_gauge(
+        lines, "wms_event_stream_subscribers", "Open stock event streams.",
+        {(): subscribers["all_branch_subscribers"] + sum(subscribers["branch_subscribers"].values())},
+    )
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
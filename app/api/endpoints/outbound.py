@@ -1,68 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 
-from app.core import models, schemas
-from app.api import deps
+from app.core import events, ledger, models, picking, reference_data, reservations, schemas
+from app.api import deps, pagination
 
 router = APIRouter()
 
+def check_batch_lines(db: Session, branch_id: int, lines: List[schemas.OutboundBatchLine]) -> None:
+    """Rejects empty batches, non-positive quantities and products missing from the branch."""
+    if not lines:
+        raise HTTPException(status_code=400, detail="The batch has no lines")
+    if any(line.quantity <= 0 for line in lines):
+        raise HTTPException(status_code=400, detail="Line quantities must be positive")
+
+    product_ids = {line.product_id for line in lines}
+    found_ids = reference_data.find_branch_products(db, product_ids, branch_id)
+    missing_ids = sorted(product_ids - found_ids)
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"Products not found in branch: {missing_ids}")
+
+def consumed_events(
+    allocations: List[schemas.StockLotAllocation], product_id: int, branch_id: int, outbound_order_id: int
+) -> List[dict]:
+    return [
+        events.lot_event(
+            events.LOT_CONSUMED, branch_id, allocation.lot_id, product_id,
+            quantity_picked=allocation.quantity_picked, quantity=allocation.quantity_remaining,
+            outbound_order_id=outbound_order_id,
+        )
+        for allocation in allocations
+    ]
+
+
 @router.post("/outbound/orders", response_model=schemas.OutboundOrder)
 def create_outbound_order(
     order_in: schemas.OutboundOrderCreate,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
 ):
     """
     Creates an outbound order, consuming stock from available lots using FIFO.
     """
     deps.check_branch_access(current_user, order_in.branch_id)
+    if order_in.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantity must be positive")
 
     # 1. Verify the product exists in the branch
-    db_product = db.query(models.Product).filter(
-        models.Product.id == order_in.product_id, 
-        models.Product.branch_id == order_in.branch_id
-    ).first()
+    db_product = reference_data.get_branch_product(db, order_in.product_id, order_in.branch_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found in branch")
 
-    # 2. Check for sufficient AVAILABLE stock across all lots
-    total_available = db.query(func.sum(models.StockLot.quantity)).filter(
-        models.StockLot.product_id == order_in.product_id,
-        models.StockLot.branch_id == order_in.branch_id,
-        models.StockLot.status == models.StockLotStatus.AVAILABLE
-    ).scalar() or 0
-
-    if total_available < order_in.quantity:
+    # 2. Lock the oldest lots needed (skipping those other pickers hold) and pick FIFO.
+    #    Reservations of the product wait until this pick commits.
+    reservations.hold_for_unreserved_pick(db, [order_in.product_id])
+    try:
+        allocations = picking.allocate_fifo(
+            db, order_in.product_id, order_in.branch_id, order_in.quantity
+        )
+    except picking.InsufficientStock as exc:
         raise HTTPException(
             status_code=400,
-            detail=f"Insufficient stock for product '{db_product.name}'. Available: {total_available}, Requested: {order_in.quantity}",
+            detail=f"Insufficient stock for product '{db_product.name}'. Available: {exc.available}, Requested: {exc.requested}",
         )
 
-    # 3. FIFO Picking Logic: Get available lots, oldest first
-    available_lots = db.query(models.StockLot).filter(
-        models.StockLot.product_id == order_in.product_id,
-        models.StockLot.branch_id == order_in.branch_id,
-        models.StockLot.status == models.StockLotStatus.AVAILABLE
-    ).order_by(models.StockLot.created_at.asc()).all()
-
-    quantity_to_pick = order_in.quantity
-    
-    for lot in available_lots:
-        if quantity_to_pick <= 0: break
-
-        picked_from_this_lot = min(lot.quantity, quantity_to_pick)
-        
-        lot.quantity -= picked_from_this_lot
-        quantity_to_pick -= picked_from_this_lot
-
-        if lot.quantity == 0:
-            db.delete(lot)
-        else:
-            db.add(lot) # Mark for update
-
-    # 4. Create the outbound order record
+    # 3. Create the outbound order record and its PICK movements
     db_outbound_order = models.OutboundOrder(
         product_id=order_in.product_id,
         quantity=order_in.quantity,
@@ -70,21 +73,116 @@ def create_outbound_order(
         branch_id=order_in.branch_id,
     )
     db.add(db_outbound_order)
-    
-    # 5. Commit all changes (lot updates/deletions and new outbound order)
+    db.flush()
+    ledger.record(db, ledger.pick_movements(
+        allocations, order_in.product_id, order_in.branch_id, current_user.id, db_outbound_order.id
+    ))
+
+    # 4. Stock promised to active reservations cannot be picked by unreserved orders
+    try:
+        reservations.check_unreserved(db, order_in.branch_id, {order_in.product_id: order_in.quantity})
+    except picking.InsufficientStockLines as exc:
+        shortage = exc.shortages[0]
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient unreserved stock for product '{db_product.name}'. Available: {shortage['available']}, Requested: {shortage['requested']}",
+        )
+
+    # 5. Commit all changes (lot updates, ledger movements and new outbound order)
+    events.emit(db, consumed_events(allocations, order_in.product_id, order_in.branch_id, db_outbound_order.id))
     db.commit()
     db.refresh(db_outbound_order)
-    
-    # Note: The returned OutboundOrder will not list the consumed lots,
-    # but the database state is now correct.
+
+    # The consumed lots are in the ledger (PICK movements of this order); expose them on the response too.
+    db_outbound_order.allocations = allocations
     return db_outbound_order
 
+@router.post("/outbound/orders/batch", response_model=schemas.OutboundBatchResult)
+def create_outbound_orders_batch(
+    batch_in: schemas.OutboundBatchCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Creates one outbound order per line, picking FIFO across many products of a branch.
+    - All candidate lots are fetched in one query and allocated in memory.
+    - Lot changes and orders are written in bulk and committed once: either every
+      line is picked or nothing is.
+    """
+    deps.check_branch_access(current_user, batch_in.branch_id)
+
+    # 1. Verify the lines and that every product exists in the branch
+    check_batch_lines(db, batch_in.branch_id, batch_in.lines)
+
+    # 2. Allocate every line FIFO and write the lot changes (reservations of these products wait)
+    reservations.hold_for_unreserved_pick(db, [line.product_id for line in batch_in.lines])
+    try:
+        allocations = picking.allocate_fifo_batch(db, batch_in.branch_id, batch_in.lines)
+    except picking.InsufficientStockLines as exc:
+        raise HTTPException(status_code=400, detail={"message": "Insufficient stock", "shortages": exc.shortages})
+
+    # 3. Create the outbound order records in one multi-row insert, then their PICK movements
+    outbound_orders = models.OutboundOrder.__table__
+    order_ids = db.scalars(
+        insert(outbound_orders).returning(outbound_orders.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "user_id": current_user.id,
+                "branch_id": batch_in.branch_id,
+            }
+            for line in batch_in.lines
+        ],
+    ).all()
+
+    ledger.record(db, [
+        movement
+        for line, order_id, line_allocations in zip(batch_in.lines, order_ids, allocations)
+        for movement in ledger.pick_movements(
+            line_allocations, line.product_id, batch_in.branch_id, current_user.id, order_id
+        )
+    ])
+
+    # 4. Stock promised to active reservations cannot be picked by unreserved orders
+    picked = {}
+    for line in batch_in.lines:
+        picked[line.product_id] = picked.get(line.product_id, 0) + line.quantity
+    try:
+        reservations.check_unreserved(db, batch_in.branch_id, picked)
+    except picking.InsufficientStockLines as exc:
+        raise HTTPException(status_code=400, detail={"message": "Insufficient unreserved stock", "shortages": exc.shortages})
+
+    # 5. Commit the whole batch at once
+    events.emit(db, [
+        stock_event
+        for line, order_id, line_allocations in zip(batch_in.lines, order_ids, allocations)
+        for stock_event in consumed_events(line_allocations, line.product_id, batch_in.branch_id, order_id)
+    ])
+    db.commit()
+
+    return schemas.OutboundBatchResult(
+        branch_id=batch_in.branch_id,
+        lines=[
+            schemas.OutboundBatchLineResult(
+                line=position,
+                product_id=line.product_id,
+                quantity=line.quantity,
+                outbound_order_id=order_id,
+                allocations=line_allocations,
+            )
+            for position, (line, order_id, line_allocations) in enumerate(zip(batch_in.lines, order_ids, allocations))
+        ],
+    )
+
 @router.get("/outbound/orders", response_model=List[schemas.OutboundOrder])
 def read_outbound_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
 ):
     """Retrieve outbound orders log."""
     query = db.query(models.OutboundOrder).options(
@@ -94,19 +192,20 @@ def read_outbound_orders(
     )
 
     if current_user.profile != models.UserProfile.ADMIN:
-        user_branch_ids = {branch.id for branch in current_user.branches}
+        user_branch_ids = current_user.branch_ids
         if not user_branch_ids:
             return []
         query = query.filter(models.OutboundOrder.branch_id.in_(user_branch_ids))
 
-    orders = query.order_by(models.OutboundOrder.id.desc()).offset(skip).limit(limit).all()
+    orders, next_cursor = pagination.paginate_by_id(query, models.OutboundOrder.id, cursor, skip, limit, descending=True)
+    pagination.set_next_cursor(response, next_cursor)
     return orders
 
 @router.get("/outbound/orders/{order_id}", response_model=schemas.OutboundOrder)
 def read_outbound_order(
     order_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
 ):
     """Retrieve a specific outbound order by ID."""
     order = db.query(models.OutboundOrder).options(
@@ -120,3 +219,132 @@ def read_outbound_order(
 
     deps.check_branch_access(current_user, order.branch_id)
     return order
+
+# --- Reservations ---
+
+def get_reservation_for_update(db: Session, reservation_id: int, current_user: schemas.Principal) -> models.StockReservation:
+    """Loads and locks an ACTIVE reservation the user may act on."""
+    reservation = db.query(models.StockReservation).filter(
+        models.StockReservation.id == reservation_id
+    ).with_for_update().first()
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    deps.check_branch_access(current_user, reservation.branch_id)
+    if reservation.status != models.ReservationStatus.ACTIVE:
+        raise HTTPException(status_code=400, detail=f"Reservation is already {reservation.status.value}")
+    return reservation
+
+@router.post("/outbound/reservations", response_model=List[schemas.StockReservation])
+def create_reservations(
+    reservation_in: schemas.ReservationCreate,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Reserves stock for one or more lines (e.g. a picking wave) without touching any lot.
+    - Each line is checked against AVAILABLE stock not reserved yet.
+    - All lines are reserved in one write, or none is.
+    """
+    deps.check_branch_access(current_user, reservation_in.branch_id)
+    check_batch_lines(db, reservation_in.branch_id, reservation_in.lines)
+
+    try:
+        reservation_ids = reservations.reserve(
+            db, reservation_in.branch_id, reservation_in.lines, current_user.id, reservation_in.reference
+        )
+    except picking.InsufficientStockLines as exc:
+        raise HTTPException(status_code=400, detail={"message": "Insufficient unreserved stock", "shortages": exc.shortages})
+    db.commit()
+
+    return db.scalars(
+        select(models.StockReservation)
+        .where(models.StockReservation.id.in_(reservation_ids))
+        .order_by(models.StockReservation.id)
+    ).all()
+
+@router.get("/outbound/reservations", response_model=List[schemas.StockReservation])
+def read_reservations(
+    response: Response,
+    status_filter: Optional[models.ReservationStatus] = Query(None, alias="status"),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """List reservations, newest first, optionally filtered by status."""
+    query = db.query(models.StockReservation)
+    if status_filter is not None:
+        query = query.filter(models.StockReservation.status == status_filter)
+
+    if current_user.profile != models.UserProfile.ADMIN:
+        user_branch_ids = current_user.branch_ids
+        if not user_branch_ids:
+            return []
+        query = query.filter(models.StockReservation.branch_id.in_(user_branch_ids))
+
+    items, next_cursor = pagination.paginate_by_id(query, models.StockReservation.id, cursor, skip, limit, descending=True)
+    pagination.set_next_cursor(response, next_cursor)
+    return items
+
+@router.post("/outbound/reservations/{reservation_id}/release", response_model=schemas.StockReservation)
+def release_reservation(
+    reservation_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """Cancels an active reservation, making its stock available again."""
+    reservation = get_reservation_for_update(db, reservation_id, current_user)
+    reservation.status = models.ReservationStatus.RELEASED
+    reservation.closed_at = func.now()
+    db.commit()
+    db.refresh(reservation)
+    return reservation
+
+@router.post("/outbound/reservations/{reservation_id}/commit", response_model=schemas.ReservationCommitResult)
+def commit_reservation(
+    reservation_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Confirms the physical pick of a reservation: consumes its quantity from the
+    oldest lots (FIFO) and records the outbound order.
+    """
+    # 1. Lock the reservation so it cannot be committed or released twice
+    reservation = get_reservation_for_update(db, reservation_id, current_user)
+
+    # 2. Pick FIFO; the stock was set aside, so a shortage means the lots drifted
+    try:
+        allocations = picking.allocate_fifo(db, reservation.product_id, reservation.branch_id, reservation.quantity)
+    except picking.InsufficientStock as exc:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Reserved stock is no longer in the lots. Available: {exc.available}, Requested: {exc.requested}",
+        )
+
+    # 3. Record the outbound order and close the reservation
+    db_outbound_order = models.OutboundOrder(
+        product_id=reservation.product_id,
+        quantity=reservation.quantity,
+        user_id=current_user.id,
+        branch_id=reservation.branch_id,
+    )
+    db.add(db_outbound_order)
+    db.flush()
+    reservation.status = models.ReservationStatus.COMMITTED
+    reservation.outbound_order_id = db_outbound_order.id
+    reservation.closed_at = func.now()
+    ledger.record(db, ledger.pick_movements(
+        allocations, reservation.product_id, reservation.branch_id, current_user.id, db_outbound_order.id
+    ))
+
+    # 4. Commit the pick, the order and the reservation together
+    events.emit(db, consumed_events(allocations, reservation.product_id, reservation.branch_id, db_outbound_order.id))
+    db.commit()
+    db.refresh(reservation)
+    return schemas.ReservationCommitResult(
+        reservation=reservation,
+        outbound_order_id=db_outbound_order.id,
+        allocations=allocations,
+    )
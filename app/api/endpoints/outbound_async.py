@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core import schemas
+from app.api import deps
+from app.api.endpoints import outbound
+
+# Async twins of the outbound routes, enabled with WMS_ASYNC_ROUTERS=outbound.
+# Each one runs the sync implementation on an asyncpg session via run_sync.
+router = APIRouter()
+
+@router.post("/outbound/orders", response_model=schemas.OutboundOrder)
+async def create_outbound_order(
+    order_in: schemas.OutboundOrderCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Creates an outbound order, consuming stock from available lots using FIFO.
+    """
+    return await deps.run_sync_endpoint(
+        db, outbound.create_outbound_order, schemas.OutboundOrder,
+        order_in=order_in, current_user=current_user,
+    )
+
+@router.post("/outbound/orders/batch", response_model=schemas.OutboundBatchResult)
+async def create_outbound_orders_batch(
+    batch_in: schemas.OutboundBatchCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """
+    Creates one outbound order per line, all-or-nothing, in a single transaction.
+    """
+    return await deps.run_sync_endpoint(
+        db, outbound.create_outbound_orders_batch, schemas.OutboundBatchResult,
+        batch_in=batch_in, current_user=current_user,
+    )
+
+@router.get("/outbound/orders", response_model=List[schemas.OutboundOrder])
+async def read_outbound_orders(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """Retrieve outbound orders log."""
+    return await deps.run_sync_endpoint(
+        db, outbound.read_outbound_orders, List[schemas.OutboundOrder],
+        response=response, skip=skip, limit=limit, cursor=cursor, current_user=current_user,
+    )
+
+@router.get("/outbound/orders/{order_id}", response_model=schemas.OutboundOrder)
+async def read_outbound_order(
+    order_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user),
+):
+    """Retrieve a specific outbound order by ID."""
+    return await deps.run_sync_endpoint(
+        db, outbound.read_outbound_order, schemas.OutboundOrder,
+        order_id=order_id, current_user=current_user,
+    )
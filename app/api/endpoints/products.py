@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
-from app.api import deps
+from app.api import deps, pagination
 
 router = APIRouter()
 
@@ -23,14 +23,17 @@ def create_product(
 
 @router.get("/", response_model=List[schemas.Product])
 def read_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(deps.get_db),
 ):
     """
     Retrieve products.
     """
-    products = crud.get_products(db, skip=skip, limit=limit)
+    products = crud.get_products(db, skip=skip, limit=limit, after_id=pagination.decode_id_cursor(cursor))
+    pagination.set_next_cursor(response, pagination.next_id_cursor(products, limit))
     return products
 
 
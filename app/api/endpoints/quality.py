@@ -1,18 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import Integer, cast, column, func, select, update, values
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 
-from app.core import models, schemas
-from app.api import deps
+from app.core import events, ledger, models, schemas
+from app.api import deps, pagination
 
 router = APIRouter()
 
+INSPECTION_TARGETS = [models.StockLotStatus.AVAILABLE, models.StockLotStatus.QUARANTINED]
+
+def inspection_movements(
+    lot, new_status: models.StockLotStatus, previous_quantity: int, new_quantity: int, user_id: int
+) -> List[dict]:
+    """Ledger rows for a lot leaving PENDING: the move itself, then any quantity correction."""
+    common = dict(stock_lot_id=lot.id, product_id=lot.product_id, branch_id=lot.branch_id, user_id=user_id)
+    return [
+        ledger.movement(models.MovementType.INSPECTION, status=models.StockLotStatus.PENDING, quantity=-previous_quantity, **common),
+        ledger.movement(models.MovementType.INSPECTION, status=new_status, quantity=previous_quantity, **common),
+        ledger.movement(models.MovementType.ADJUSTMENT, status=new_status, quantity=new_quantity - previous_quantity, **common),
+    ]
+
+def inspection_event(lot, new_status: models.StockLotStatus, previous_quantity: int, new_quantity: int) -> dict:
+    return events.lot_event(
+        events.LOT_INSPECTED, lot.branch_id, lot.id, lot.product_id,
+        status=new_status.value, previous_quantity=previous_quantity, quantity=new_quantity,
+    )
+
+def inspection_error(
+    current_status: models.StockLotStatus, new_status: models.StockLotStatus, new_quantity: int
+) -> Optional[str]:
+    """Why an inspection cannot be applied to a lot, or None if it can."""
+    if current_status != models.StockLotStatus.PENDING:
+        return f"Cannot change status from '{current_status}'. Only PENDING lots can be inspected."
+    if new_status not in INSPECTION_TARGETS:
+        return "Invalid target status. Must be AVAILABLE or QUARANTINED."
+    if new_quantity < 0:
+        return "Quantity cannot be negative"
+    return None
+
+def check_inspector(current_user: schemas.Principal) -> None:
+    if current_user.profile not in [models.UserProfile.ADMIN, models.UserProfile.SUPERVISOR]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User does not have permission to perform quality inspection."
+        )
+
+
 @router.put("/quality/stock_lots/{lot_id}", response_model=schemas.StockLot)
 def update_stock_lot_status(
     lot_id: int,
     lot_update: schemas.StockLotUpdate,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Update the status of a stock lot (e.g., for quality inspection).
@@ -20,14 +61,10 @@ def update_stock_lot_status(
     - Restricted to SUPERVISOR and ADMIN profiles.
     """
     # 1. Check user profile for authorization
-    if current_user.profile not in [models.UserProfile.ADMIN, models.UserProfile.SUPERVISOR]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User does not have permission to perform quality inspection."
-        )
+    check_inspector(current_user)
 
-    # 2. Find the stock lot
-    db_stock_lot = db.query(models.StockLot).filter(models.StockLot.id == lot_id).first()
+    # 2. Find and lock the stock lot, so it is inspected only once
+    db_stock_lot = db.query(models.StockLot).filter(models.StockLot.id == lot_id).with_for_update().first()
 
     if not db_stock_lot:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stock lot not found")
@@ -35,36 +72,122 @@ def update_stock_lot_status(
     # 3. Check for branch access
     deps.check_branch_access(current_user, db_stock_lot.branch_id)
 
-    # 4. Validate the status transition (optional but good practice)
-    if db_stock_lot.status != models.StockLotStatus.PENDING:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot change status from '{db_stock_lot.status}'. Only PENDING lots can be inspected."
-        )
-    
-    if lot_update.status not in [models.StockLotStatus.AVAILABLE, models.StockLotStatus.QUARANTINED]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid target status. Must be AVAILABLE or QUARANTINED."
-        )
+    # 4. Validate the status transition and counted quantity, as batch inspections do
+    previous_quantity = db_stock_lot.quantity
+    new_quantity = lot_update.quantity if lot_update.quantity is not None else previous_quantity
+    error = inspection_error(db_stock_lot.status, lot_update.status, new_quantity)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
 
-    # 5. Update the lot
+    # 5. Update the lot and record the move (and any counted difference) in the ledger
     db_stock_lot.status = lot_update.status
     db_stock_lot.inspected_at = func.now() # Use database time
+    db_stock_lot.quantity = new_quantity
 
-    if lot_update.quantity is not None:
-        db_stock_lot.quantity = lot_update.quantity
-
+    ledger.record(db, inspection_movements(
+        db_stock_lot, db_stock_lot.status, previous_quantity, db_stock_lot.quantity, current_user.id
+    ))
+    events.emit(db, [inspection_event(db_stock_lot, db_stock_lot.status, previous_quantity, db_stock_lot.quantity)])
     db.commit()
     db.refresh(db_stock_lot)
     return db_stock_lot
 
+@router.post("/quality/stock_lots/inspections", response_model=schemas.StockLotInspectionBatchResult)
+def inspect_stock_lots(
+    batch_in: schemas.StockLotInspectionBatch,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Inspects many PENDING lots at once, e.g. after an inbound wave.
+    - Lots are loaded and locked in one query and updated with one bulk UPDATE.
+    - Each lot succeeds or fails on its own; the response has one result per
+      requested lot, with the reason for every failure.
+    - Restricted to SUPERVISOR and ADMIN profiles.
+    """
+    check_inspector(current_user)
+    if not batch_in.inspections:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The batch has no inspections")
+
+    # 1. Load and lock every requested lot (id order, so concurrent batches do not deadlock)
+    stock_lots = models.StockLot.__table__
+    lot_ids = {inspection.lot_id for inspection in batch_in.inspections}
+    lots = {
+        lot.id: lot
+        for lot in db.execute(
+            select(stock_lots.c.id, stock_lots.c.product_id, stock_lots.c.branch_id, stock_lots.c.status, stock_lots.c.quantity)
+            .where(stock_lots.c.id.in_(lot_ids))
+            .order_by(stock_lots.c.id)
+            .with_for_update()
+        ).all()
+    }
+
+    # 2. Validate each inspection on its own
+    is_admin = current_user.profile == models.UserProfile.ADMIN
+    seen = set()
+    results = []
+    accepted = []
+    for inspection in batch_in.inspections:
+        lot = lots.get(inspection.lot_id)
+        quantity = inspection.quantity if inspection.quantity is not None else (lot.quantity if lot else None)
+        error = None
+        if inspection.lot_id in seen:
+            error = "Lot appears more than once in the batch"
+        elif lot is None:
+            error = "Stock lot not found"
+        elif not is_admin and lot.branch_id not in current_user.branch_ids:
+            error = "You do not have access to this branch's resources."
+        else:
+            error = inspection_error(lot.status, inspection.status, quantity)
+        seen.add(inspection.lot_id)
+
+        if error:
+            results.append(schemas.StockLotInspectionResult(lot_id=inspection.lot_id, ok=False, error=error))
+            continue
+        accepted.append((lot, inspection.status, quantity))
+        results.append(schemas.StockLotInspectionResult(
+            lot_id=inspection.lot_id, ok=True, status=inspection.status, quantity=quantity
+        ))
+
+    # 3. Apply all accepted inspections with one UPDATE ... FROM (VALUES ...) and record them
+    if accepted:
+        inspected = values(
+            column("id", Integer), column("status", stock_lots.c.status.type), column("quantity", Integer),
+            name="inspected",
+        ).data([(lot.id, new_status, quantity) for lot, new_status, quantity in accepted])
+        db.execute(
+            update(stock_lots)
+            .where(stock_lots.c.id == inspected.c.id, stock_lots.c.status == models.StockLotStatus.PENDING)
+            .values(
+                status=cast(inspected.c.status, stock_lots.c.status.type),
+                quantity=inspected.c.quantity,
+                inspected_at=func.now(),
+            )
+        )
+        ledger.record(db, [
+            movement
+            for lot, new_status, quantity in accepted
+            for movement in inspection_movements(lot, new_status, lot.quantity, quantity, current_user.id)
+        ])
+        events.emit(db, [
+            inspection_event(lot, new_status, lot.quantity, quantity) for lot, new_status, quantity in accepted
+        ])
+        db.commit()
+
+    return schemas.StockLotInspectionBatchResult(
+        inspected=len(accepted),
+        failed=len(results) - len(accepted),
+        results=results,
+    )
+
 @router.get("/quality/stock_lots/pending", response_model=List[schemas.StockLot])
 def get_pending_stock_lots(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Get a list of all stock lots currently in PENDING status.
@@ -72,17 +195,103 @@ def get_pending_stock_lots(
     - Admins see all pending lots.
     - Supervisors/Operators see lots from their assigned branches.
     """
+    # selectinload: one extra IN query per relationship instead of widening every row
     query = db.query(models.StockLot).filter(models.StockLot.status == models.StockLotStatus.PENDING).options(
-        joinedload(models.StockLot.product),
-        joinedload(models.StockLot.branch),
-        joinedload(models.StockLot.created_by_user)
+        selectinload(models.StockLot.product).selectinload(models.Product.branch),
+        selectinload(models.StockLot.branch),
+        selectinload(models.StockLot.created_by_user).selectinload(models.User.branches),
     )
 
     if current_user.profile != models.UserProfile.ADMIN:
-        user_branch_ids = {branch.id for branch in current_user.branches}
+        user_branch_ids = current_user.branch_ids
         if not user_branch_ids:
             return []
         query = query.filter(models.StockLot.branch_id.in_(user_branch_ids))
     
-    lots = query.order_by(models.StockLot.created_at.asc()).offset(skip).limit(limit).all()
+    lots, next_cursor = pagination.paginate_by_created_at(
+        query, models.StockLot.created_at, models.StockLot.id, cursor, skip, limit
+    )
+    pagination.set_next_cursor(response, next_cursor)
     return lots
+
+# --- Dashboard ---
+
+# Upper age limit of each bucket, oldest bucket last (no limit)
+AGE_BUCKET_LIMITS = [
+    (schemas.PendingAgeBucket.UNDER_24H, timedelta(hours=24)),
+    (schemas.PendingAgeBucket.ONE_TO_THREE_DAYS, timedelta(days=3)),
+    (schemas.PendingAgeBucket.OVER_3_DAYS, None),
+]
+
+def age_bucket(created_at: datetime, now: datetime) -> schemas.PendingAgeBucket:
+    age = now - created_at
+    for bucket, limit in AGE_BUCKET_LIMITS:
+        if limit is None or age < limit:
+            return bucket
+
+@router.get("/quality/dashboard/pending", response_model=List[schemas.PendingLotRow])
+def read_pending_dashboard(
+    response: Response,
+    branch_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    age: Optional[schemas.PendingAgeBucket] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(deps.get_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Lean read path for the QC screen: PENDING lots, oldest first, with just the
+    columns the screen shows (one joined query, no ORM objects).
+    - Filter by branch, product and age bucket.
+    - Admins see all branches, others only their own.
+    """
+    stock_lot = models.StockLot
+    query = (
+        db.query(
+            stock_lot.id,
+            stock_lot.quantity,
+            stock_lot.created_at,
+            stock_lot.product_id,
+            models.Product.name.label("product_name"),
+            stock_lot.branch_id,
+            models.Branch.name.label("branch_name"),
+            models.User.email.label("created_by"),
+        )
+        .join(models.Product, models.Product.id == stock_lot.product_id)
+        .join(models.Branch, models.Branch.id == stock_lot.branch_id)
+        .outerjoin(models.User, models.User.id == stock_lot.created_by_user_id)
+        .filter(stock_lot.status == models.StockLotStatus.PENDING)
+    )
+
+    if branch_id is not None:
+        deps.check_branch_access(current_user, branch_id)
+        query = query.filter(stock_lot.branch_id == branch_id)
+    elif current_user.profile != models.UserProfile.ADMIN:
+        user_branch_ids = current_user.branch_ids
+        if not user_branch_ids:
+            return []
+        query = query.filter(stock_lot.branch_id.in_(user_branch_ids))
+    if product_id is not None:
+        query = query.filter(stock_lot.product_id == product_id)
+
+    now = datetime.now(timezone.utc)
+    if age is not None:
+        # Age bucket as a created_at range, so the pending (created_at, id) indexes still apply
+        position = [bucket for bucket, _ in AGE_BUCKET_LIMITS].index(age)
+        younger_than = AGE_BUCKET_LIMITS[position][1]
+        older_than = AGE_BUCKET_LIMITS[position - 1][1] if position else None
+        if younger_than is not None:
+            query = query.filter(stock_lot.created_at > now - younger_than)
+        if older_than is not None:
+            query = query.filter(stock_lot.created_at <= now - older_than)
+
+    rows, next_cursor = pagination.paginate_by_created_at(
+        query, stock_lot.created_at, stock_lot.id, cursor, skip, limit
+    )
+    pagination.set_next_cursor(response, next_cursor)
+    return [
+        schemas.PendingLotRow(**row._mapping, age_bucket=age_bucket(row.created_at, now))
+        for row in rows
+    ]
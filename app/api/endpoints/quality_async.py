@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core import schemas
+from app.api import deps
+from app.api.endpoints import quality
+
+# Async twins of the quality routes, enabled with WMS_ASYNC_ROUTERS=quality.
+# Each one runs the sync implementation on an asyncpg session via run_sync.
+router = APIRouter()
+
+@router.put("/quality/stock_lots/{lot_id}", response_model=schemas.StockLot)
+async def update_stock_lot_status(
+    lot_id: int,
+    lot_update: schemas.StockLotUpdate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Update the status of a stock lot (PENDING -> AVAILABLE or QUARANTINED).
+    """
+    return await deps.run_sync_endpoint(
+        db, quality.update_stock_lot_status, schemas.StockLot,
+        lot_id=lot_id, lot_update=lot_update, current_user=current_user,
+    )
+
+@router.get("/quality/stock_lots/pending", response_model=List[schemas.StockLot])
+async def get_pending_stock_lots(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
+):
+    """
+    Get a list of all stock lots currently in PENDING status.
+    """
+    return await deps.run_sync_endpoint(
+        db, quality.get_pending_stock_lots, List[schemas.StockLot],
+        response=response, skip=skip, limit=limit, cursor=cursor, current_user=current_user,
+    )
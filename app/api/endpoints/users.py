@@ -1,26 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from typing import List, Optional
 
 from app.core import models, schemas, security
-from app.api import deps
+from app.core.token_versions import token_versions
+from app.api import deps, pagination
 
 router = APIRouter()
 
+def hash_password(password: str) -> str:
+    """Hashes on the bounded password pool; 503 when it is saturated."""
+    try:
+        return security.password_pool.run(security.get_password_hash, password)
+    except security.PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password hashing is busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+
 # --- Current User Actions ---
 
 @router.post("/users/change-password", status_code=status.HTTP_200_OK)
 def change_password(
     password_data: schemas.PasswordChange,
     db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user)
+    current_user: schemas.Principal = Depends(deps.get_current_active_user)
 ):
     """
     Allows a logged-in user to change their own password.
     """
-    current_user.hashed_password = security.get_password_hash(password_data.new_password)
-    db.add(current_user)
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
+    user.hashed_password = hash_password(password_data.new_password)
+    user.token_version += 1 # Revokes tokens issued with the old password
+    db.add(user)
     db.commit()
+    token_versions.set(user.id, user.token_version)
+    deps.invalidate_principal(current_user.email)
     return {"message": "Password updated successfully"}
 
 # --- Admin-only User Management ---
@@ -29,7 +45,7 @@ def change_password(
 def create_user(
     user_in: schemas.UserCreate,
     db: Session = Depends(deps.get_db),
-    current_admin: models.User = Depends(deps.get_current_admin_user)
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
 ):
     """
     Creates a new user and associates them with branches. Admin only.
@@ -44,7 +60,7 @@ def create_user(
     branch_ids = user_data.pop('branch_ids', None)
     password = user_data.pop('password')
 
-    hashed_password = security.get_password_hash(password)
+    hashed_password = hash_password(password)
     new_user = models.User(**user_data, hashed_password=hashed_password)
 
     if branch_ids:
@@ -63,22 +79,26 @@ def create_user(
 
 @router.get("/users/", response_model=List[schemas.User])
 def read_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(deps.get_db),
-    current_admin: models.User = Depends(deps.get_current_admin_user)
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
 ):
     """
     Lists all users with their branch associations. Admin only.
     """
-    users = db.query(models.User).options(joinedload(models.User.branches)).offset(skip).limit(limit).all()
+    query = db.query(models.User).options(joinedload(models.User.branches))
+    users, next_cursor = pagination.paginate_by_id(query, models.User.id, cursor, skip, limit)
+    pagination.set_next_cursor(response, next_cursor)
     return users
 
 @router.get("/users/{user_id}", response_model=schemas.User)
 def read_user(
     user_id: int,
     db: Session = Depends(deps.get_db),
-    current_admin: models.User = Depends(deps.get_current_admin_user)
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
 ):
     """
     Gets a specific user by ID with branch associations. Admin only.
@@ -93,7 +113,7 @@ def update_user(
     user_id: int,
     user_in: schemas.UserUpdate,
     db: Session = Depends(deps.get_db),
-    current_admin: models.User = Depends(deps.get_current_admin_user)
+    current_admin: schemas.Principal = Depends(deps.get_current_admin_user)
 ):
     """
     Updates a user's info, including branch associations. Admin only.
@@ -102,6 +122,7 @@ def update_user(
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
+    previous_email = user.email
     update_data = user_in.dict(exclude_unset=True)
 
     if 'branch_ids' in update_data:
@@ -119,8 +140,11 @@ def update_user(
 
     for key, value in update_data.items():
         setattr(user, key, value)
+    user.token_version += 1 # Tokens carry profile and branches; revoke the old ones
 
     db.add(user)
     db.commit()
     db.refresh(user)
+    token_versions.set(user.id, user.token_version)
+    deps.invalidate_principal(previous_email, user.email)
     return user
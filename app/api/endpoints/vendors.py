@@ -1,9 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app import crud, schemas
-from app.api import deps
+from app.api import deps, pagination
 
 router = APIRouter()
 
@@ -17,11 +17,15 @@ def create_vendor(
 
 @router.get("/", response_model=List[schemas.Vendor])
 def read_vendors(
+    response: Response,
     db: Session = Depends(deps.get_db), 
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None,
 ):
-    return crud.get_vendors(db, skip=skip, limit=limit)
+    vendors = crud.get_vendors(db, skip=skip, limit=limit, after_id=pagination.decode_id_cursor(cursor))
+    pagination.set_next_cursor(response, pagination.next_id_cursor(vendors, limit))
+    return vendors
 
 @router.get("/{vendor_id}", response_model=schemas.Vendor)
 def read_vendor(
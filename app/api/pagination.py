@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+# Keyset (cursor) pagination. List endpoints accept an opaque `cursor` and return
+# the cursor of the next page in this header; without a cursor they keep the
+# old skip/limit behaviour, so existing clients are unaffected.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(**values) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *keys: str) -> dict:
+    """Decodes a cursor and checks it has `keys`; 400 for anything malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, dict) or not all(key in values for key in keys):
+            raise ValueError(cursor)
+        return values
+    except (ValueError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def decode_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        return int(decode_cursor(cursor, "id")["id"])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def next_id_cursor(items: List, limit: int) -> Optional[str]:
+    """Cursor after the last item, or None when this was the last page."""
+    if not items or len(items) < limit:
+        return None
+    return encode_cursor(id=items[-1].id)
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+# --- Query Helpers ---
+
+def paginate_by_id(query, id_column, cursor: Optional[str], skip: int, limit: int, descending: bool = False) -> Tuple[List, Optional[str]]:
+    """Pages a query ordered by `id_column`; returns (items, next_cursor)."""
+    after_id = decode_id_cursor(cursor)
+    if after_id is not None:
+        query = query.filter(id_column < after_id if descending else id_column > after_id)
+    query = query.order_by(id_column.desc() if descending else id_column.asc())
+    if after_id is None:
+        query = query.offset(skip)
+    items = query.limit(limit).all()
+    return items, next_id_cursor(items, limit)
+
+def paginate_by_created_at(query, created_at_column, id_column, cursor: Optional[str], skip: int, limit: int) -> Tuple[List, Optional[str]]:
+    """Pages a query ordered by (created_at, id) ascending; returns (items, next_cursor)."""
+    if cursor:
+        values = decode_cursor(cursor, "created_at", "id")
+        try:
+            after = (datetime.fromisoformat(values["created_at"]), int(values["id"]))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(tuple_(created_at_column, id_column) > after)
+    query = query.order_by(created_at_column.asc(), id_column.asc())
+    if not cursor:
+        query = query.offset(skip)
+    items = query.limit(limit).all()
+
+    next_cursor = None
+    if items and len(items) == limit:
+        next_cursor = encode_cursor(created_at=items[-1].created_at.isoformat(), id=items[-1].id)
+    return items, next_cursor
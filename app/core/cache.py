@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Reference caches use this shared backend (e.g. redis://localhost:6379/0) when
+# set, so every worker sees the same entries and invalidations; otherwise each
+# process keeps its own LRU and the TTLs bound staleness across processes.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+REFERENCE_CACHE_MAXSIZE = int(os.getenv("REFERENCE_CACHE_MAXSIZE", "10000"))
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries also expire `ttl` seconds
+    after they were stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """
+    Shared backend with the TTLCache interface. `client` needs the redis-py
+    get/set(ex=)/delete/scan_iter methods, so tests can pass a local stand-in.
+    Values are stored with `dumps`/`loads`; backend errors count as misses, and
+    failed invalidations leave the entry to expire with its TTL.
+    """
+
+    def __init__(self, client, namespace: str, ttl: float, dumps: Callable = json.dumps, loads: Callable = json.loads):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"wms:{self.namespace}:{key}"
+
+    def _count(self, field: str) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception as exc:
+            self._count("errors")
+            logger.warning("Cache backend get failed for %s: %s", self._key(key), exc)
+            raw = None
+        if raw is None:
+            self._count("misses")
+            return default
+        self._count("hits")
+        return self.loads(raw)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        try:
+            self.client.set(self._key(key), self.dumps(value), ex=max(1, int(self.ttl)))
+        except Exception as exc:
+            self._count("errors")
+            logger.warning("Cache backend set failed for %s: %s", self._key(key), exc)
+
+    # Invalidations run after the write has committed, so a backend error must
+    # not fail the request: it is logged and counted, and the TTL bounds how long
+    # the stale entry can be served.
+    def pop(self, key: Hashable) -> None:
+        try:
+            self.client.delete(self._key(key))
+        except Exception as exc:
+            self._count("errors")
+            logger.warning("Cache backend delete failed for %s: %s", self._key(key), exc)
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter(match=self._key("*")))
+            if keys:
+                self.client.delete(*keys)
+        except Exception as exc:
+            self._count("errors")
+            logger.warning("Cache backend clear failed for %s: %s", self._key("*"), exc)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+_shared_client = None
+
+def shared_client():
+    """The Redis client of CACHE_REDIS_URL (created on first use), or None when unset."""
+    global _shared_client
+    if CACHE_REDIS_URL and _shared_client is None:
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_REDIS_URL is set but the 'redis' package is not installed") from exc
+        _shared_client = redis.Redis.from_url(CACHE_REDIS_URL)
+    return _shared_client
+
+# --- Read-through Reference Caches ---
+
+def ttl_from_env(entity: str, default: float) -> float:
+    """Per-entity TTL, e.g. BRANCH_CACHE_TTL_SECONDS for "branch"."""
+    return float(os.getenv(f"{entity.upper()}_CACHE_TTL_SECONDS", str(default)))
+
+# Every ReadThroughCache, by name (read by the metrics endpoints)
+reference_caches: Dict[str, "ReadThroughCache"] = {}
+
+
+class ReadThroughCache:
+    """
+    Cache of one kind of reference data, keyed by id and holding pydantic
+    schemas (never ORM instances, which are bound to a session). Loads on a
+    miss; writers call `invalidate` after committing. Misses are not cached,
+    so a row created later is found at once.
+    """
+
+    def __init__(self, name: str, schema, ttl: float, maxsize: int = REFERENCE_CACHE_MAXSIZE):
+        self.name = name
+        self.schema = schema
+        self.invalidations = 0
+        client = shared_client()
+        if client is not None:
+            self.backend = RedisCache(client, name, ttl, dumps=lambda value: value.model_dump_json(), loads=schema.model_validate_json)
+        else:
+            self.backend = TTLCache(maxsize=maxsize, ttl=ttl)
+        reference_caches[name] = self
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Optional[Any]:
+        """Cached value of `key`, or `load()` (an ORM row or None) validated into the schema and cached."""
+        value = self.backend.get(key)
+        if value is None:
+            row = load()
+            if row is None:
+                return None
+            value = self.schema.model_validate(row, from_attributes=True)
+            self.backend.set(key, value)
+        return value
+
+    def get_many_or_load(self, keys: Iterable[Hashable], load_many: Callable[[list], Iterable[Any]]) -> Dict[Hashable, Any]:
+        """Like get_or_load for several ids; the missing ones are loaded with one `load_many(ids)` call."""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.backend.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            for row in load_many(missing):
+                value = self.schema.model_validate(row, from_attributes=True)
+                self.backend.set(value.id, value)
+                found[value.id] = value
+        return found
+
+    def invalidate(self, *keys: Hashable) -> None:
+        for key in keys:
+            self.backend.pop(key)
+        self.invalidations += len(keys)
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {"backend": "redis" if isinstance(self.backend, RedisCache) else "lru", "invalidations": self.invalidations, **self.backend.stats()}
+
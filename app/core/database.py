@@ -1,15 +1,76 @@
 import os
+from uuid import uuid4
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 
+from app.core import slow_queries
+from app.core.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+def to_async_url(url: str) -> str:
+    """Maps a sync PostgreSQL URL to the asyncpg driver."""
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# --- Connection Pool Settings ---
+# Size the pool per worker: workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay
+# below the server's max_connections. With DB_PGBOUNCER=true the app keeps no
+# pool of its own (PgBouncer does the pooling) and asyncpg stops caching
+# prepared statements, which transaction pooling cannot route.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+def pool_options(is_async: bool = False) -> dict:
+    """Engine keyword arguments for the configured pooling mode."""
+    if DB_PGBOUNCER:
+        return {"poolclass": NullPool, "pool_pre_ping": DB_POOL_PRE_PING}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def async_connect_args() -> dict:
+    if not DB_PGBOUNCER:
+        return {}
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+engine = create_engine(DATABASE_URL, **pool_options())
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Async Stack ---
+# Used by the async routers (see WMS_ASYNC_ROUTERS in app/main.py).
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=async_connect_args(), **pool_options(is_async=True)
+)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Slow query log (opt-in through SLOW_QUERY_MS, see app/core/slow_queries.py)
+slow_queries.install(engine)
+slow_queries.install(async_engine.sync_engine)
+
 Base = declarative_base()
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import os
+import select as selectors
+import threading
+from collections import defaultdict
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Stock lot change events for live dashboards. Endpoints stash events on the
+# session (`emit`); they are only delivered once that transaction commits and
+# are dropped on rollback. Delivery fans out in process, per branch, to the
+# subscribed streams. With EVENTS_PG_BRIDGE=true events travel through
+# Postgres NOTIFY instead, so every API worker sees every commit.
+LOT_CREATED = "lot.created"
+LOT_INSPECTED = "lot.inspected"
+LOT_CONSUMED = "lot.consumed"
+
+EVENTS_PG_BRIDGE = os.getenv("EVENTS_PG_BRIDGE", "false").lower() in ("1", "true", "yes")
+EVENTS_CHANNEL = "wms_stock_events"
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENTS_SUBSCRIBER_QUEUE_SIZE", "1000"))
+NOTIFY_PAYLOAD_LIMIT = 7500 # Postgres rejects NOTIFY payloads from 8000 bytes
+
+PENDING_EVENTS_KEY = "pending_stock_events"
+
+# --- Emitting ---
+
+def lot_event(event_type: str, branch_id: int, lot_id: int, product_id: int, **fields) -> dict:
+    return {"type": event_type, "branch_id": branch_id, "lot_id": lot_id, "product_id": product_id, **fields}
+
+
+def emit(db: Session, events: Iterable[dict]) -> None:
+    """Queues events to be published when the session's transaction commits."""
+    db.info.setdefault(PENDING_EVENTS_KEY, []).extend(events)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session: Session) -> None:
+    # NOTIFY is transactional: listeners get it exactly when (and if) this commits.
+    # Savepoint releases fire this hook too; only the outermost commit notifies.
+    pending = session.info.get(PENDING_EVENTS_KEY)
+    if not EVENTS_PG_BRIDGE or not pending or session.in_nested_transaction():
+        return
+    for payload in _notify_payloads(pending):
+        session.execute(select(func.pg_notify(EVENTS_CHANNEL, payload)))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    if session.in_nested_transaction():
+        return # A released savepoint; the outer transaction can still roll back
+    pending = session.info.pop(PENDING_EVENTS_KEY, None)
+    if pending and not EVENTS_PG_BRIDGE:
+        for stock_event in pending:
+            broker.publish(stock_event)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+def _notify_payloads(events: List[dict]) -> Iterable[str]:
+    """JSON arrays of events, each small enough for one NOTIFY."""
+    chunk: List[str] = []
+    size = 2
+    for stock_event in events:
+        encoded = json.dumps(stock_event, separators=(",", ":"))
+        if chunk and size + len(encoded) + 1 > NOTIFY_PAYLOAD_LIMIT:
+            yield "[" + ",".join(chunk) + "]"
+            chunk, size = [], 2
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        yield "[" + ",".join(chunk) + "]"
+
+# --- In-process Fan-out ---
+
+class Subscription:
+    """A stream's bounded queue; when it is full the oldest event is dropped."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, branch_ids: Optional[Set[int]], maxsize: int):
+        self.loop = loop
+        self.branch_ids = branch_ids # None: every branch
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def _put(self, stock_event: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(stock_event)
+
+
+class EventBroker:
+    def __init__(self):
+        self._by_branch = defaultdict(set)
+        self._all_branches: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, branch_ids: Optional[Iterable[int]] = None, maxsize: int = SUBSCRIBER_QUEUE_SIZE) -> Subscription:
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(asyncio.get_running_loop(), set(branch_ids) if branch_ids is not None else None, maxsize)
+        with self._lock:
+            if subscription.branch_ids is None:
+                self._all_branches.add(subscription)
+            for branch_id in subscription.branch_ids or ():
+                self._by_branch[branch_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._all_branches.discard(subscription)
+            for branch_id in subscription.branch_ids or ():
+                self._by_branch[branch_id].discard(subscription)
+                if not self._by_branch[branch_id]:
+                    del self._by_branch[branch_id]
+
+    def publish(self, stock_event: dict) -> None:
+        """Delivers an event to the streams of its branch; safe to call from any thread."""
+        with self._lock:
+            targets = self._all_branches | self._by_branch.get(stock_event["branch_id"], set())
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._put, stock_event)
+            except RuntimeError: # The stream's loop is already closed
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "all_branch_subscribers": len(self._all_branches),
+                "branch_subscribers": {branch_id: len(subs) for branch_id, subs in self._by_branch.items()},
+            }
+
+
+broker = EventBroker()
+
+# --- Postgres LISTEN/NOTIFY Bridge ---
+
+class PgNotifyBridge:
+    """Background thread LISTENing on the events channel and publishing to the local broker."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None or not EVENTS_PG_BRIDGE:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stock-events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Stock events listener failed, reconnecting")
+                self._stop.wait(1)
+
+    def _listen(self) -> None:
+        from app.core.database import engine
+
+        raw = engine.raw_connection()
+        try:
+            connection = raw.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {EVENTS_CHANNEL}")
+            while not self._stop.is_set():
+                if selectors.select([connection], [], [], 1.0) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notification = connection.notifies.pop(0)
+                    for stock_event in json.loads(notification.payload):
+                        broker.publish(stock_event)
+        finally:
+            # Never hand a LISTENing, autocommit connection back to the pool
+            raw.invalidate()
+
+
+pg_bridge = PgNotifyBridge()
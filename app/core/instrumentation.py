@@ -0,0 +1,208 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Requests issuing more statements than this are logged as N+1 suspects
+N_PLUS_ONE_QUERY_THRESHOLD = int(os.getenv("N_PLUS_ONE_QUERY_THRESHOLD", "20"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "<unmatched>" # One label for every 404, so paths cannot blow up the series count
+
+# --- Per-request SQL Accounting ---
+
+class RequestStats:
+    """SQL issued while serving one request; shared with the threads and tasks it spawns."""
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.scope = scope or {}
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        """Path template of the matched route (known once routing has run)."""
+        return getattr(self.scope.get("route"), "path", UNMATCHED_ROUTE)
+
+    def observe(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            self.queries += 1
+            self.sql_seconds += seconds
+            self.statements[statement] += 1
+
+
+# Set by the middleware; sync endpoints see it too because the threadpool copies the context.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+# The start time lives on the statement's execution context rather than the
+# connection, so a statement that fails (and never reaches the after hook) leaves nothing behind.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None and context is not None:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.observe(statement, time.perf_counter() - started)
+
+# --- Metric Storage ---
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot: above the largest bucket
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """Per-route request, latency and SQL metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.query_counts: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.queries: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.sql_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.n_plus_one: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.query_counts.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.requests[(method, route, status_code)] += 1
+            self.queries[key] += stats.queries
+            self.sql_seconds[key] += stats.sql_seconds
+            if stats.queries > N_PLUS_ONE_QUERY_THRESHOLD:
+                self.n_plus_one[key] += 1
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        with self._lock:
+            render_histogram(lines, "wms_http_request_duration_seconds", "Request latency by route.", self.latency)
+            render_counter(lines, "wms_http_requests_total", "Requests by route and status code.", {
+                (method, route, str(code)): value for (method, route, code), value in self.requests.items()
+            }, ("method", "route", "status"))
+            render_histogram(lines, "wms_db_queries_per_request", "SQL statements issued per request.", self.query_counts)
+            render_counter(lines, "wms_db_queries_total", "SQL statements issued by route.", self.queries)
+            render_counter(lines, "wms_db_query_duration_seconds_total", "Time spent in SQL by route.", self.sql_seconds)
+            render_counter(
+                lines, "wms_n_plus_one_suspects_total",
+                f"Requests issuing more than {N_PLUS_ONE_QUERY_THRESHOLD} SQL statements.", self.n_plus_one,
+            )
+        return lines
+
+
+request_metrics = RequestMetrics()
+
+# --- Prometheus Text Format ---
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_counter(lines: List[str], name: str, help_text: str, values: Dict[Tuple, float], label_names=("method", "route")):
+    render_metric(lines, name, "counter", help_text, values, label_names)
+
+def render_gauge(lines: List[str], name: str, help_text: str, values: Dict[Tuple, float], label_names=()):
+    render_metric(lines, name, "gauge", help_text, values, label_names)
+
+def render_metric(lines: List[str], name: str, kind: str, help_text: str, values: Dict[Tuple, float], label_names):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for label_values, value in sorted(values.items()):
+        lines.append(f"{name}{format_labels(label_names, label_values)} {format_value(value)}")
+
+def render_histogram(lines: List[str], name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram]):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else format_value(float(bound))
+            lines.append(f"{name}_bucket{format_labels(('method', 'route', 'le'), (method, route, le))} {cumulative}")
+        labels = format_labels(("method", "route"), (method, route))
+        lines.append(f"{name}_sum{labels} {format_value(histogram.total)}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+# --- ASGI Middleware ---
+
+class InstrumentationMiddleware:
+    """
+    Times each HTTP request, counts the SQL it issues, records both per route
+    and adds a Server-Timing header. Pure ASGI, so streaming responses pass
+    through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'app;dur={elapsed_ms:.1f}, db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.queries} queries"',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - started
+            route = stats.route
+            request_metrics.observe(scope["method"], route, status_code, elapsed, stats)
+            if stats.queries > N_PLUS_ONE_QUERY_THRESHOLD:
+                statement, repeats = stats.statements.most_common(1)[0]
+                logger.warning(
+                    "Possible N+1: %s %s issued %d SQL statements (%.1f ms); most repeated (%dx): %s",
+                    scope["method"], route, stats.queries, stats.sql_seconds * 1000, repeats, " ".join(statement.split())[:300],
+                )
@@ -0,0 +1,182 @@
+from typing import List, Optional, Sequence
+
+from sqlalchemy import and_, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from app.core import models, schemas, stock_balance
+
+inventory_movements = models.InventoryMovement.__table__
+stock_lots = models.StockLot.__table__
+stock_balances = models.StockBalance.__table__
+snapshot_lines = models.InventorySnapshotLine.__table__
+
+# --- Recording ---
+
+def movement(
+    movement_type: models.MovementType,
+    stock_lot_id: int,
+    product_id: int,
+    branch_id: int,
+    status: models.StockLotStatus,
+    quantity: int,
+    user_id: Optional[int] = None,
+    outbound_order_id: Optional[int] = None,
+) -> dict:
+    return {
+        "movement_type": movement_type,
+        "stock_lot_id": stock_lot_id,
+        "product_id": product_id,
+        "branch_id": branch_id,
+        "status": status,
+        "quantity": quantity,
+        "user_id": user_id,
+        "outbound_order_id": outbound_order_id,
+    }
+
+
+def pick_movements(
+    allocations: Sequence[schemas.StockLotAllocation],
+    product_id: int,
+    branch_id: int,
+    user_id: int,
+    outbound_order_id: int,
+) -> List[dict]:
+    return [
+        movement(
+            models.MovementType.PICK, allocation.lot_id, product_id, branch_id,
+            models.StockLotStatus.AVAILABLE, -allocation.quantity_picked,
+            user_id=user_id, outbound_order_id=outbound_order_id,
+        )
+        for allocation in allocations
+    ]
+
+
+def record(db: Session, movements: Sequence[dict]) -> None:
+    """
+    Appends movements to the ledger in one multi-row INSERT and applies them to
+    stock_balances. Must be called next to the matching stock_lots change so
+    all three commit (or roll back) together.
+    """
+    rows = [row for row in movements if row["quantity"]]
+    if not rows:
+        return
+    db.execute(insert(inventory_movements), rows)
+    stock_balance.apply_deltas(db, [
+        (row["product_id"], row["branch_id"], row["status"], row["quantity"]) for row in rows
+    ])
+
+# --- Derived Lot Balances ---
+
+def _ledger_by_lot():
+    return (
+        select(
+            inventory_movements.c.stock_lot_id,
+            inventory_movements.c.status,
+            func.sum(inventory_movements.c.quantity).label("quantity"),
+        )
+        .group_by(inventory_movements.c.stock_lot_id, inventory_movements.c.status)
+        .having(func.sum(inventory_movements.c.quantity) != 0)
+    )
+
+
+def lot_balances(db: Session, lot_ids: Sequence[int]) -> List[dict]:
+    """Quantity of each lot per status, derived from the ledger alone."""
+    rows = db.execute(_ledger_by_lot().where(inventory_movements.c.stock_lot_id.in_(lot_ids))).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def find_lot_drift(db: Session) -> List[dict]:
+    """
+    Compares stock_lots with the lot balances derived from the ledger and
+    returns the (lot, status) pairs that differ, with `expected` (ledger) and
+    `recorded` (stock_lots) quantities.
+    """
+    expected = _ledger_by_lot().subquery("expected")
+    recorded = (
+        select(stock_lots.c.id.label("stock_lot_id"), stock_lots.c.status, stock_lots.c.quantity)
+        .where(stock_lots.c.quantity != 0)
+        .subquery("recorded")
+    )
+    joined = expected.outerjoin(
+        recorded,
+        and_(expected.c.stock_lot_id == recorded.c.stock_lot_id, expected.c.status == recorded.c.status),
+        full=True,
+    )
+    expected_quantity = func.coalesce(expected.c.quantity, 0)
+    recorded_quantity = func.coalesce(recorded.c.quantity, 0)
+    rows = db.execute(
+        select(
+            func.coalesce(expected.c.stock_lot_id, recorded.c.stock_lot_id).label("stock_lot_id"),
+            func.coalesce(expected.c.status, recorded.c.status).label("status"),
+            expected_quantity.label("expected"),
+            recorded_quantity.label("recorded"),
+        )
+        .select_from(joined)
+        .where(expected_quantity != recorded_quantity)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def backfill_opening_movements(db: Session) -> int:
+    """
+    Gives lots created before the ledger existed an opening ADJUSTMENT for
+    their current quantity. Balances already include them, so only the ledger
+    is written. Returns the number of lots backfilled.
+    """
+    without_history = ~select(inventory_movements.c.id).where(
+        inventory_movements.c.stock_lot_id == stock_lots.c.id
+    ).exists()
+    result = db.execute(
+        insert(inventory_movements).from_select(
+            ["movement_type", "stock_lot_id", "product_id", "branch_id", "status", "quantity", "user_id", "created_at"],
+            select(
+                literal(models.MovementType.ADJUSTMENT, inventory_movements.c.movement_type.type),
+                stock_lots.c.id,
+                stock_lots.c.product_id,
+                stock_lots.c.branch_id,
+                stock_lots.c.status,
+                stock_lots.c.quantity,
+                stock_lots.c.created_by_user_id,
+                func.coalesce(stock_lots.c.created_at, func.now()),
+            ).where(stock_lots.c.quantity != 0, without_history),
+        )
+    )
+    return result.rowcount
+
+# --- Snapshots ---
+
+def take_snapshot(db: Session) -> models.InventorySnapshot:
+    """
+    Stores the current stock per branch, product and status as a snapshot.
+    The ledger is locked against new movements for the few milliseconds it
+    takes to copy stock_balances, so the lines match the ledger exactly up to
+    the recorded `last_movement_id`.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE inventory_movements IN SHARE MODE"))
+
+    last_movement_id = db.scalar(select(func.coalesce(func.max(inventory_movements.c.id), 0)))
+    snapshot = models.InventorySnapshot(last_movement_id=last_movement_id)
+    if db.get_bind().dialect.name == "postgresql":
+        # Wall-clock time once the lock is held: every movement in the snapshot
+        # is older, and every later one either is newer or has a higher id.
+        snapshot.taken_at = func.clock_timestamp()
+    db.add(snapshot)
+    db.flush()
+
+    balances = stock_balance.summed(
+        stock_balances.c.branch_id, stock_balances.c.product_id, stock_balances.c.status
+    ).subquery("balances")
+    db.execute(
+        insert(snapshot_lines).from_select(
+            ["snapshot_id", "branch_id", "product_id", "status", "quantity"],
+            select(
+                literal(snapshot.id),
+                balances.c.branch_id,
+                balances.c.product_id,
+                balances.c.status,
+                balances.c.quantity,
+            ).where(balances.c.quantity != 0),
+        )
+    )
+    return snapshot
@@ -1,6 +1,6 @@
 import enum
 from sqlalchemy import (
-    Boolean, Column, Integer, String, ForeignKey, Enum, Table, DateTime
+    Boolean, Column, Integer, String, ForeignKey, Enum, Table, DateTime, Index, and_
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -35,6 +35,17 @@ class StockLotStatus(str, enum.Enum):
     AVAILABLE = "available"  # In stock, ready for use
     QUARANTINED = "quarantined" # Failed inspection, not for use
 
+class MovementType(str, enum.Enum):
+    RECEIPT = "receipt"        # Lot created by an inbound order
+    INSPECTION = "inspection"  # Lot moved out of PENDING by quality
+    ADJUSTMENT = "adjustment"  # Quantity corrected (e.g. counted at inspection)
+    PICK = "pick"              # Consumed by an outbound order
+
+class ReservationStatus(str, enum.Enum):
+    ACTIVE = "active"        # Holds stock, lots not touched yet
+    COMMITTED = "committed"  # Picked: lots consumed by an outbound order
+    RELEASED = "released"    # Cancelled, stock free again
+
 # --- Association Table for User-Branch Many-to-Many relationship ---
 user_branch_association = Table(
     'user_branch_association', Base.metadata,
@@ -66,9 +77,26 @@ class Product(Base):
     # Relationships
     branch = relationship("Branch", back_populates="products")
     stock_lots = relationship("StockLot", back_populates="product")
+    stock_balances = relationship("StockBalance", lazy="selectin", viewonly=True)
     # Note: The direct relationship to inbound/outbound orders is removed
     # as all inventory movements will be tracked via StockLots.
 
+    # Inventory totals, read from the materialized balances instead of summing lots
+    def _balance(self, status: "StockLotStatus") -> int:
+        return sum(b.quantity for b in self.stock_balances if b.status == status)
+
+    @property
+    def quantity_available(self) -> int:
+        return self._balance(StockLotStatus.AVAILABLE)
+
+    @property
+    def quantity_pending(self) -> int:
+        return self._balance(StockLotStatus.PENDING)
+
+    @property
+    def quantity_quarantined(self) -> int:
+        return self._balance(StockLotStatus.QUARANTINED)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -77,11 +105,17 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     profile = Column(Enum(UserProfile), default=UserProfile.OPERATOR, nullable=False)
+    # Bumped whenever credentials or authorization data change; revokes older tokens
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     # Relationships
     branches = relationship("Branch", secondary=user_branch_association, back_populates="users")
     created_stock_lots = relationship("StockLot", back_populates="created_by_user")
 
+    @property
+    def branch_ids(self) -> set:
+        return {branch.id for branch in self.branches}
+
 class InboundOrder(Base):
     __tablename__ = "inbound_orders"
 
@@ -90,6 +124,7 @@ class InboundOrder(Base):
     quantity = Column(Integer, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
     # This order will now generate one or more stock lots
@@ -102,7 +137,7 @@ class StockLot(Base):
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
-    inbound_order_id = Column(Integer, ForeignKey("inbound_orders.id"), nullable=False)
+    inbound_order_id = Column(Integer, ForeignKey("inbound_orders.id"), nullable=False, index=True)
     
     quantity = Column(Integer, nullable=False)
     status = Column(Enum(StockLotStatus), nullable=False, default=StockLotStatus.PENDING)
@@ -112,6 +147,27 @@ class StockLot(Base):
     
     created_by_user_id = Column(Integer, ForeignKey("users.id"))
 
+    # Partial indexes matching the hot paths (see the stock lot indexes migrations):
+    # - FIFO picks: AVAILABLE lots with stock left, of a product in a branch, oldest first.
+    # - Quality dashboard: PENDING lots, oldest first, with or without a branch filter.
+    __table_args__ = (
+        Index(
+            "ix_stock_lots_available_fifo",
+            product_id, branch_id, created_at, id,
+            postgresql_where=and_(status == StockLotStatus.AVAILABLE, quantity > 0),
+        ),
+        Index(
+            "ix_stock_lots_pending_branch",
+            branch_id, created_at, id,
+            postgresql_where=(status == StockLotStatus.PENDING),
+        ),
+        Index(
+            "ix_stock_lots_pending",
+            created_at, id,
+            postgresql_where=(status == StockLotStatus.PENDING),
+        ),
+    )
+
     # Relationships
     product = relationship("Product", back_populates="stock_lots")
     branch = relationship("Branch", back_populates="stock_lots")
@@ -119,6 +175,21 @@ class StockLot(Base):
     created_by_user = relationship("User", back_populates="created_stock_lots")
 
 
+class StockBalance(Base):
+    """
+    Materialized SUM(stock_lots.quantity) per product, branch and status, spread
+    over `shard` rows that are summed when read (see app.core.stock_balance).
+    Kept in sync by app.core.ledger.record in the same transaction as the lot changes.
+    """
+    __tablename__ = "stock_balances"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    branch_id = Column(Integer, ForeignKey("branches.id"), primary_key=True)
+    status = Column(Enum(StockLotStatus), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0, server_default="0")
+    quantity = Column(Integer, nullable=False, default=0)
+
+
 class OutboundOrder(Base):
     __tablename__ = "outbound_orders"
 
@@ -127,7 +198,92 @@ class OutboundOrder(Base):
     quantity = Column(Integer)
     user_id = Column(Integer, ForeignKey("users.id"))
     branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Note: The relationship between OutboundOrder and StockLot is more complex.
     # An outbound order might consume from multiple lots. This will be handled
     # in the business logic layer, potentially with an association table later.
+
+
+class StockReservation(Base):
+    """
+    A soft claim on AVAILABLE stock of a product in a branch. Reserving only
+    writes this row; the lots are consumed when the reservation is committed.
+    """
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    status = Column(Enum(ReservationStatus), nullable=False, default=ReservationStatus.ACTIVE)
+    reference = Column(String, nullable=True) # e.g. the wave or customer order it was planned for
+
+    outbound_order_id = Column(Integer, ForeignKey("outbound_orders.id"), nullable=True) # Set on commit
+    created_by_user_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    closed_at = Column(DateTime(timezone=True), nullable=True) # Committed or released
+
+    # Reserved totals are summed from this index alone (index-only scan).
+    __table_args__ = (
+        Index(
+            "ix_stock_reservations_active",
+            product_id, branch_id, quantity,
+            postgresql_where=(status == ReservationStatus.ACTIVE),
+        ),
+    )
+
+    product = relationship("Product")
+    branch = relationship("Branch")
+
+
+class InventoryMovement(Base):
+    """
+    Append-only ledger of every stock change, one row per lot and status bucket.
+    Rows are never updated or deleted: the quantity of a lot in a status is the
+    SUM of its movements, and stock_lots/stock_balances are kept as its
+    materialized current state.
+    """
+    __tablename__ = "inventory_movements"
+
+    id = Column(Integer, primary_key=True)
+    movement_type = Column(Enum(MovementType), nullable=False)
+    stock_lot_id = Column(Integer, ForeignKey("stock_lots.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=False)
+    status = Column(Enum(StockLotStatus), nullable=False) # Bucket the quantity moves in or out of
+    quantity = Column(Integer, nullable=False) # Signed delta
+
+    outbound_order_id = Column(Integer, ForeignKey("outbound_orders.id"), nullable=True) # Set for picks
+    user_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_inventory_movements_branch_created_at", branch_id, created_at),
+    )
+
+
+class InventorySnapshot(Base):
+    """
+    Stock per branch, product and status at a point of the ledger: the lines
+    cover every movement up to and including `last_movement_id`.
+    """
+    __tablename__ = "inventory_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    last_movement_id = Column(Integer, nullable=False, default=0)
+
+    lines = relationship("InventorySnapshotLine", back_populates="snapshot", cascade="all, delete-orphan")
+
+
+class InventorySnapshotLine(Base):
+    __tablename__ = "inventory_snapshot_lines"
+
+    snapshot_id = Column(Integer, ForeignKey("inventory_snapshots.id", ondelete="CASCADE"), primary_key=True)
+    branch_id = Column(Integer, ForeignKey("branches.id"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    status = Column(Enum(StockLotStatus), primary_key=True)
+    quantity = Column(Integer, nullable=False)
+
+    snapshot = relationship("InventorySnapshot", back_populates="lines")
@@ -0,0 +1,326 @@
+import os
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, column, func, literal, select, true, tuple_, update, values
+from sqlalchemy.orm import Session
+
+from app.core import models, schemas
+
+stock_lots = models.StockLot.__table__
+
+
+class InsufficientStock(Exception):
+    """Raised when a pick asks for more than the AVAILABLE stock of a product."""
+
+    def __init__(self, available: int, requested: int):
+        self.available = available
+        self.requested = requested
+        super().__init__(f"Available: {available}, Requested: {requested}")
+
+
+class InsufficientStockLines(Exception):
+    """Raised when one or more lines of a batch pick cannot be fully served."""
+
+    def __init__(self, shortages: List[dict]):
+        self.shortages = shortages
+        super().__init__(f"{len(shortages)} line(s) with insufficient stock")
+
+
+# --- FIFO Allocation ---
+
+# Lots locked per round trip while looking for enough stock. Lots of the last
+# chunk that turn out not to be needed stay locked until commit, so keep it small.
+PICK_LOCK_CHUNK_SIZE = int(os.getenv("PICK_LOCK_CHUNK_SIZE", "16"))
+
+
+def build_lot_lock(
+    product_ids: Sequence[int],
+    branch_id: int,
+    skip_locked: bool = True,
+    after: Optional[Tuple] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Selects and row-locks the AVAILABLE lots of `product_ids` in a branch, in
+    FIFO order per product. With `skip_locked`, lots held by concurrent pickers
+    are passed over instead of waited for. `after` is a (created_at, id) keyset
+    to continue from the previous chunk.
+    """
+    stmt = (
+        select(stock_lots.c.id, stock_lots.c.product_id, stock_lots.c.quantity, stock_lots.c.created_at)
+        .where(
+            stock_lots.c.product_id.in_(product_ids),
+            stock_lots.c.branch_id == branch_id,
+            stock_lots.c.status == models.StockLotStatus.AVAILABLE,
+            stock_lots.c.quantity > 0, # Consumed lots are kept, with nothing left
+        )
+        .order_by(stock_lots.c.product_id, stock_lots.c.created_at, stock_lots.c.id)
+        .with_for_update(of=stock_lots, skip_locked=skip_locked)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(stock_lots.c.created_at, stock_lots.c.id) > after)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def _lock_until_covered(
+    db: Session, product_id: int, branch_id: int, quantity: int, skip_locked: bool, chunk_size: int
+) -> Tuple[Deque[list], int]:
+    lots: Deque[list] = deque()
+    locked_total = 0
+    after = None
+    while locked_total < quantity:
+        rows = db.execute(
+            build_lot_lock([product_id], branch_id, skip_locked=skip_locked, after=after, limit=chunk_size)
+        ).all()
+        for row in rows:
+            lots.append([row.id, row.quantity])
+            locked_total += row.quantity
+        # A short chunk ends a SKIP LOCKED pass. A blocking pass can come back short
+        # while more lots exist: rows emptied by the picker it waited for are re-checked
+        # after the wait and dropped (READ COMMITTED), so it stops only when nothing is left.
+        if not rows or (skip_locked and len(rows) < chunk_size):
+            break
+        after = (rows[-1].created_at, rows[-1].id)
+    return lots, locked_total
+
+
+def lock_fifo_lots(
+    db: Session,
+    product_id: int,
+    branch_id: int,
+    quantity: int,
+    skip_locked: bool = True,
+    chunk_size: int = PICK_LOCK_CHUNK_SIZE,
+) -> Tuple[Deque[list], int]:
+    """
+    Locks the oldest AVAILABLE lots of a product until they cover `quantity`
+    and returns them as a FIFO deque of [lot_id, quantity] with their total.
+
+    Lots are locked in small chunks with SKIP LOCKED, so parallel picks of the
+    same SKU take different lots instead of queueing behind each other. A short
+    result may only mean that other pickers hold the rest, so in that case the
+    chunked pass is undone (releasing its locks) and repeated waiting on every
+    lock, in FIFO order: the total it returns is then the real availability.
+    """
+    if skip_locked:
+        savepoint = db.begin_nested()
+        lots, locked_total = _lock_until_covered(db, product_id, branch_id, quantity, True, chunk_size)
+        if locked_total >= quantity:
+            savepoint.commit()
+            return lots, locked_total
+        savepoint.rollback()
+    return _lock_until_covered(db, product_id, branch_id, quantity, False, chunk_size)
+
+
+def build_fifo_pick(product_id: int, branch_id: int, quantity: int, chunk_size: int = PICK_LOCK_CHUNK_SIZE):
+    """
+    Builds a single statement that locks the first chunk of AVAILABLE lots of a
+    product (SKIP LOCKED, FIFO) and, if they cover `quantity`, consumes it from
+    them. A running total over the locked lots tells how much stock sits in front
+    of each one, so only the lots that are actually needed are decremented.
+    Returns the locked total and one row per lot picked, in FIFO order; nothing
+    is written when the locked total is below `quantity`.
+    """
+    requested = literal(quantity)
+    locked = build_lot_lock([product_id], branch_id, limit=chunk_size).cte("locked")
+    ordered = select(
+        locked.c.id,
+        locked.c.quantity,
+        func.sum(locked.c.quantity).over(order_by=(locked.c.created_at, locked.c.id)).label("running_total"),
+        func.sum(locked.c.quantity).over().label("total_locked"),
+    ).cte("ordered")
+
+    # Stock sitting in front of a lot is `running_total - quantity`; the lot is
+    # needed while that is still below the requested quantity.
+    ahead = ordered.c.running_total - ordered.c.quantity
+    picks = (
+        select(
+            ordered.c.id.label("lot_id"),
+            ordered.c.quantity,
+            ordered.c.running_total,
+            func.least(ordered.c.quantity, requested - ahead).label("picked"),
+        )
+        .where(ordered.c.total_locked >= requested, ahead < requested)
+        .cte("picks")
+    )
+    decremented = (
+        update(stock_lots)
+        .where(stock_lots.c.id == picks.c.lot_id)
+        .values(quantity=picks.c.quantity - picks.c.picked)
+        .returning(stock_lots.c.id)
+        .cte("decremented")
+    )
+    totals = select(func.coalesce(func.max(ordered.c.total_locked), 0).label("available")).cte("totals")
+
+    return (
+        select(
+            totals.c.available,
+            picks.c.lot_id,
+            picks.c.picked,
+            (picks.c.quantity - picks.c.picked).label("remaining"),
+        )
+        .select_from(totals.outerjoin(picks, true()))
+        .order_by(picks.c.running_total)
+        .add_cte(decremented)
+    )
+
+
+def pick_first_chunk(
+    db: Session, product_id: int, branch_id: int, quantity: int
+) -> Optional[List[schemas.StockLotAllocation]]:
+    """
+    Runs build_fifo_pick: one round trip for the common, uncontended pick.
+    Returns None, with the chunk still locked, if the first chunk was short.
+    """
+    rows = db.execute(build_fifo_pick(product_id, branch_id, quantity)).all()
+    if rows[0].available < quantity:
+        return None
+    return [
+        schemas.StockLotAllocation(lot_id=row.lot_id, quantity_picked=row.picked, quantity_remaining=row.remaining)
+        for row in rows
+    ]
+
+
+def allocate_fifo(
+    db: Session, product_id: int, branch_id: int, quantity: int, skip_locked: bool = True
+) -> List[schemas.StockLotAllocation]:
+    """
+    Consumes `quantity` units of a product from its AVAILABLE lots (FIFO) and
+    returns the per-lot allocation. Only the lots needed are locked, until the
+    caller commits. Raises InsufficientStock, without touching any lot, if stock is short.
+
+    Picks covered by the first free chunk of lots take a single statement
+    (pick_first_chunk). Larger or contended picks undo it and go through
+    lock_fifo_lots, which keeps locking chunks and falls back to waiting.
+    """
+    if skip_locked:
+        savepoint = db.begin_nested()
+        allocations = pick_first_chunk(db, product_id, branch_id, quantity)
+        if allocations is not None:
+            savepoint.commit()
+            return allocations
+        savepoint.rollback() # Releases the chunk, so the passes below lock in FIFO order again
+
+    lots, available = lock_fifo_lots(db, product_id, branch_id, quantity, skip_locked=skip_locked)
+    if available < quantity:
+        raise InsufficientStock(available=available, requested=quantity)
+
+    allocations = plan_fifo(lots, quantity)
+    write_allocations(db, allocations)
+    return allocations
+
+
+# --- Batch Allocation ---
+
+def plan_fifo(lots: Deque[list], quantity: int) -> List[schemas.StockLotAllocation]:
+    """
+    Consumes `quantity` from `lots`, a FIFO-ordered deque of [lot_id, quantity]
+    pairs that is updated in place so later lines continue where this one stopped.
+    The caller must check that enough stock is left.
+    """
+    allocations = []
+    quantity_to_pick = quantity
+    while quantity_to_pick > 0:
+        lot = lots[0]
+        picked_from_this_lot = min(lot[1], quantity_to_pick)
+        lot[1] -= picked_from_this_lot
+        quantity_to_pick -= picked_from_this_lot
+        allocations.append(
+            schemas.StockLotAllocation(
+                lot_id=lot[0],
+                quantity_picked=picked_from_this_lot,
+                quantity_remaining=lot[1],
+            )
+        )
+        if lot[1] == 0:
+            lots.popleft()
+    return allocations
+
+
+def write_allocations(db: Session, allocations: Sequence[schemas.StockLotAllocation]) -> None:
+    """
+    Applies allocations with a single UPDATE of the lots' remaining quantities.
+    Emptied lots are kept at 0 so their ledger history still points at them.
+    """
+    final_quantities: Dict[int, int] = {}
+    for allocation in allocations:
+        final_quantities[allocation.lot_id] = allocation.quantity_remaining
+    if not final_quantities:
+        return
+
+    remaining = values(
+        column("id", Integer), column("quantity", Integer), name="remaining"
+    ).data(list(final_quantities.items()))
+    db.execute(
+        update(stock_lots)
+        .where(stock_lots.c.id == remaining.c.id)
+        .values(quantity=remaining.c.quantity)
+    )
+
+
+def _lock_batch(
+    db: Session, branch_id: int, requested: Dict[int, int], skip_locked: bool, chunk_size: int
+) -> Tuple[Dict[int, Deque[list]], Dict[int, int]]:
+    lots_by_product = {}
+    available_by_product = {}
+    for product_id in sorted(requested): # Same order in every batch, so two batches do not lock each other out
+        lots_by_product[product_id], available_by_product[product_id] = _lock_until_covered(
+            db, product_id, branch_id, requested[product_id], skip_locked, chunk_size
+        )
+    return lots_by_product, available_by_product
+
+
+def _plan_batch(
+    lots_by_product: Dict[int, Deque[list]], available_by_product: Dict[int, int], lines: Sequence[schemas.OutboundBatchLine]
+) -> Tuple[List[dict], List[List[schemas.StockLotAllocation]]]:
+    available_by_product = dict(available_by_product)
+    shortages = []
+    planned = []
+    for position, line in enumerate(lines):
+        available = available_by_product[line.product_id]
+        if available < line.quantity:
+            shortages.append({
+                "line": position,
+                "product_id": line.product_id,
+                "available": available,
+                "requested": line.quantity,
+            })
+            planned.append([])
+            continue
+        available_by_product[line.product_id] -= line.quantity
+        planned.append(plan_fifo(lots_by_product[line.product_id], line.quantity))
+    return shortages, planned
+
+
+def allocate_fifo_batch(
+    db: Session, branch_id: int, lines: Sequence[schemas.OutboundBatchLine], chunk_size: int = PICK_LOCK_CHUNK_SIZE
+) -> List[List[schemas.StockLotAllocation]]:
+    """
+    Allocates every line of a batch FIFO, then writes the lot changes in bulk.
+    For each product only the oldest lots covering the total its lines request
+    are locked, as lock_fifo_lots does for a single pick. Lines for the same
+    product are served in request order. Returns the allocations of each line.
+    Raises InsufficientStockLines, without writing anything, if any line is short.
+    """
+    requested: Dict[int, int] = defaultdict(int)
+    for line in lines:
+        requested[line.product_id] += line.quantity
+
+    # Same two passes as lock_fifo_lots: skip lots other pickers hold, and only
+    # if that leaves a product short, wait for every lock to get the real totals.
+    savepoint = db.begin_nested()
+    shortages, planned = _plan_batch(*_lock_batch(db, branch_id, requested, True, chunk_size), lines)
+    if shortages:
+        savepoint.rollback()
+        shortages, planned = _plan_batch(*_lock_batch(db, branch_id, requested, False, chunk_size), lines)
+    else:
+        savepoint.commit()
+
+    if shortages:
+        raise InsufficientStockLines(shortages)
+
+    write_allocations(db, [allocation for line_allocations in planned for allocation in line_allocations])
+    return planned
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class CheckoutWaitStats:
+    """Accumulates how long requests waited for a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.count,
+                "total_wait_seconds": round(self.total_seconds, 6),
+                "avg_wait_seconds": round(self.total_seconds / self.count, 6) if self.count else 0.0,
+                "max_wait_seconds": round(self.max_seconds, 6),
+                "timeouts": self.timeouts,
+            }
+
+
+# One entry per engine; kept outside the pool because dispose() recreates pools.
+checkout_waits = {"sync": CheckoutWaitStats(), "async": CheckoutWaitStats()}
+
+
+class _TimedCheckoutMixin:
+    stats_key = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            checkout_waits[self.stats_key].observe(time.perf_counter() - started, timed_out=True)
+            raise
+        checkout_waits[self.stats_key].observe(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    stats_key = "sync"
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    stats_key = "async"
+
+
+def pool_status(engine: Engine) -> dict:
+    """Current occupancy of an engine's pool plus its accumulated checkout waits."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "in_use": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    stats_key = getattr(pool, "stats_key", None)
+    if stats_key is not None:
+        status["checkout_wait"] = checkout_waits[stats_key].snapshot()
+    return status
@@ -0,0 +1,37 @@
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core import models, schemas
+from app.core.cache import ReadThroughCache, ttl_from_env
+
+# Branches, and the branch of each product that order lines are checked
+# against. Both change rarely (a product never moves to another branch), so the
+# order endpoints read them here instead of querying on every request.
+branch_cache = ReadThroughCache("branches", schemas.Branch, ttl_from_env("branch", 600))
+branch_product_cache = ReadThroughCache("branch_products", schemas.ProductRef, ttl_from_env("branch_product", 300))
+
+product_ref_columns = (models.Product.id, models.Product.name, models.Product.branch_id)
+
+def get_branch(db: Session, branch_id: int) -> Optional[schemas.Branch]:
+    return branch_cache.get_or_load(branch_id, lambda: db.get(models.Branch, branch_id))
+
+def get_branch_product(db: Session, product_id: int, branch_id: int) -> Optional[schemas.ProductRef]:
+    """The product if it exists in the branch, else None."""
+    product = branch_product_cache.get_or_load(
+        product_id,
+        # Plain columns: loading the entity would also load its stock balances
+        lambda: db.execute(select(*product_ref_columns).where(models.Product.id == product_id)).first(),
+    )
+    if product is None or product.branch_id != branch_id:
+        return None
+    return product
+
+def find_branch_products(db: Session, product_ids: Iterable[int], branch_id: int) -> Set[int]:
+    """Which of `product_ids` exist in the branch; the uncached ones are looked up in one query."""
+    products = branch_product_cache.get_many_or_load(
+        set(product_ids),
+        lambda missing: db.execute(select(*product_ref_columns).where(models.Product.id.in_(missing))).all(),
+    )
+    return {product_id for product_id, product in products.items() if product.branch_id == branch_id}
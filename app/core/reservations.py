@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core import models, schemas, stock_balance
+from app.core.picking import InsufficientStockLines
+
+stock_balances = models.StockBalance.__table__
+stock_reservations = models.StockReservation.__table__
+
+# Stock that can still be promised is the AVAILABLE balance minus the ACTIVE
+# reservations. Two per-product advisory locks keep picks and reservations from
+# promising the same units twice:
+# - the reservation gate: unreserved picks hold it shared from before they touch
+#   any lot, reserving takes it exclusively. A reservation therefore waits for
+#   in-flight picks and sees their decrements, and no reservation appears while
+#   a pick is running, so picks of a SKU without reservations never wait for each other;
+# - the reserved stock lock: only picks of a SKU that has ACTIVE reservations
+#   take it, to re-check one at a time with the earlier picks committed.
+RESERVATION_GATE_LOCK = 0x57D5_0002
+RESERVED_STOCK_LOCK = 0x57D5_0003
+
+
+def lock_products(db: Session, namespace: int, product_ids: Sequence[int], shared: bool = False) -> None:
+    """Transaction-level advisory locks on (namespace, product_id), taken in product order."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    function = "pg_advisory_xact_lock_shared" if shared else "pg_advisory_xact_lock"
+    for product_id in sorted(set(product_ids)):
+        db.execute(text(f"SELECT {function}(:namespace, :product_id)"), {"namespace": namespace, "product_id": product_id})
+
+
+def hold_for_unreserved_pick(db: Session, product_ids: Sequence[int]) -> None:
+    """
+    Holds the products' reservation gates shared until commit. Unreserved picks
+    call it before locking lots or decrementing balances, then check_unreserved.
+    """
+    lock_products(db, RESERVATION_GATE_LOCK, product_ids, shared=True)
+
+
+def reserved_quantities(db: Session, branch_id: int, product_ids: Sequence[int]) -> Dict[int, int]:
+    """SUM of ACTIVE reservations per product, served by the partial index."""
+    rows = db.execute(
+        select(stock_reservations.c.product_id, func.sum(stock_reservations.c.quantity))
+        .where(
+            stock_reservations.c.product_id.in_(product_ids),
+            stock_reservations.c.branch_id == branch_id,
+            stock_reservations.c.status == models.ReservationStatus.ACTIVE,
+        )
+        .group_by(stock_reservations.c.product_id)
+    ).all()
+    return {product_id: quantity for product_id, quantity in rows}
+
+
+def available_quantities(db: Session, branch_id: int, product_ids: Sequence[int]) -> Dict[int, int]:
+    """AVAILABLE balances per product."""
+    rows = db.execute(
+        stock_balance.summed(stock_balances.c.product_id).where(
+            stock_balances.c.product_id.in_(product_ids),
+            stock_balances.c.branch_id == branch_id,
+            stock_balances.c.status == models.StockLotStatus.AVAILABLE,
+        )
+    ).all()
+    return {product_id: quantity for product_id, quantity in rows}
+
+
+def reserve(
+    db: Session,
+    branch_id: int,
+    lines: Sequence[schemas.OutboundBatchLine],
+    user_id: int,
+    reference: Optional[str] = None,
+) -> List[int]:
+    """
+    Reserves every line against unreserved AVAILABLE stock and returns the new
+    reservation ids, in line order. No lot is read or locked.
+    Raises InsufficientStockLines, without writing anything, if any line is short.
+    """
+    product_ids = sorted({line.product_id for line in lines})
+    lock_products(db, RESERVATION_GATE_LOCK, product_ids)
+    on_hand = available_quantities(db, branch_id, product_ids)
+    reserved = reserved_quantities(db, branch_id, product_ids)
+    free = {product_id: on_hand.get(product_id, 0) - reserved.get(product_id, 0) for product_id in product_ids}
+
+    shortages = []
+    for position, line in enumerate(lines):
+        if free[line.product_id] < line.quantity:
+            shortages.append({
+                "line": position,
+                "product_id": line.product_id,
+                "available": max(free[line.product_id], 0),
+                "requested": line.quantity,
+            })
+            continue
+        free[line.product_id] -= line.quantity
+    if shortages:
+        raise InsufficientStockLines(shortages)
+
+    return db.scalars(
+        insert(stock_reservations).returning(stock_reservations.c.id, sort_by_parameter_order=True),
+        [
+            {
+                "product_id": line.product_id,
+                "branch_id": branch_id,
+                "quantity": line.quantity,
+                "status": models.ReservationStatus.ACTIVE,
+                "reference": reference,
+                "created_by_user_id": user_id,
+            }
+            for line in lines
+        ],
+    ).all()
+
+
+def check_unreserved(db: Session, branch_id: int, picked: Dict[int, int]) -> None:
+    """
+    Verifies that unreserved picks (product_id -> quantity) did not eat into
+    reserved stock. Must run after hold_for_unreserved_pick and after their
+    AVAILABLE balances were decremented in this transaction. Products without
+    ACTIVE reservations pass without waiting; the others are re-checked one
+    pick at a time, each seeing the picks committed before it.
+    Raises InsufficientStockLines with the unreserved stock there was before the pick.
+    """
+    reserved = reserved_quantities(db, branch_id, sorted(picked))
+    product_ids = sorted(product_id for product_id in picked if reserved.get(product_id))
+    if not product_ids:
+        return
+    lock_products(db, RESERVED_STOCK_LOCK, product_ids)
+    on_hand = available_quantities(db, branch_id, product_ids)
+    reserved = reserved_quantities(db, branch_id, product_ids)
+
+    shortages = []
+    for product_id in product_ids:
+        left = on_hand.get(product_id, 0) - reserved.get(product_id, 0)
+        if left < 0:
+            shortages.append({
+                "product_id": product_id,
+                "available": max(left + picked[product_id], 0),
+                "requested": picked[product_id],
+            })
+    if shortages:
+        raise InsufficientStockLines(shortages)
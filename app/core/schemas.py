@@ -1,7 +1,8 @@
+import enum
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import FrozenSet, Optional, List
 from datetime import datetime
-from app.core.models import UserProfile, StockLotStatus
+from app.core.models import UserProfile, StockLotStatus, ReservationStatus
 
 # --- Base & Create Schemas ---
 
@@ -36,6 +37,14 @@ class InboundOrderBase(BaseModel):
 class InboundOrderCreate(InboundOrderBase):
     pass
 
+class InboundBatchLine(BaseModel):
+    product_id: int
+    quantity: int
+
+class InboundBatchCreate(BaseModel):
+    branch_id: int
+    lines: List[InboundBatchLine]
+
 class StockLotBase(BaseModel):
     product_id: int
     branch_id: int
@@ -70,16 +79,83 @@ class UserUpdate(BaseModel):
     profile: Optional[UserProfile] = None
     branch_ids: Optional[List[int]] = None
 
+class StockLotInspection(BaseModel):
+    lot_id: int
+    status: StockLotStatus # AVAILABLE or QUARANTINED
+    quantity: Optional[int] = None # Counted quantity, if it differs from the received one
+
+class StockLotInspectionBatch(BaseModel):
+    inspections: List[StockLotInspection]
+
 class StockLotUpdate(BaseModel):
     status: StockLotStatus # The primary field to be updated (e.g., PENDING -> AVAILABLE)
     quantity: Optional[int] = None # Optional: if inspection finds a different quantity
 
+# --- Picking Schemas ---
+
+class StockLotAllocation(BaseModel):
+    lot_id: int
+    quantity_picked: int
+    quantity_remaining: int # 0 means the lot was fully consumed
+
+class OutboundBatchLine(BaseModel):
+    product_id: int
+    quantity: int
+
+class OutboundBatchCreate(BaseModel):
+    branch_id: int
+    lines: List[OutboundBatchLine]
+
+class OutboundBatchLineResult(BaseModel):
+    line: int # Position of the line in the request
+    product_id: int
+    quantity: int
+    outbound_order_id: int
+    allocations: List[StockLotAllocation] = []
+
+class OutboundBatchResult(BaseModel):
+    branch_id: int
+    lines: List[OutboundBatchLineResult]
+
+# --- Reservation Schemas ---
+
+class ReservationCreate(BaseModel):
+    branch_id: int
+    lines: List[OutboundBatchLine]
+    reference: Optional[str] = None
+
+class StockReservation(BaseModel):
+    id: int
+    product_id: int
+    branch_id: int
+    quantity: int
+    status: ReservationStatus
+    reference: Optional[str] = None
+    outbound_order_id: Optional[int] = None
+    created_by_user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    closed_at: Optional[datetime] = None
+
+    class Config: from_attributes = True
+
+class ReservationCommitResult(BaseModel):
+    reservation: StockReservation
+    outbound_order_id: int
+    allocations: List[StockLotAllocation]
+
 # --- Full Schemas (for API responses) ---
 
 class Branch(BranchBase):
     id: int
     class Config: from_attributes = True
 
+class ProductRef(BaseModel):
+    """The product fields order checks need (cached reference data, no stock totals)."""
+    id: int
+    name: Optional[str] = None
+    branch_id: int
+    class Config: from_attributes = True
+
 # Pre-declare User and Product to handle circular references
 class User(UserBase):
     id: int
@@ -92,7 +168,7 @@ class Product(ProductBase):
     id: int
     branch: Branch
 
-    # New calculated fields for inventory
+    # Inventory totals, served from the stock_balances table
     quantity_available: int = 0
     quantity_pending: int = 0
     quantity_quarantined: int = 0
@@ -112,21 +188,93 @@ class StockLot(StockLotBase):
 class InboundOrder(InboundOrderBase):
     id: int
     user_id: int
+    created_at: Optional[datetime] = None # Unknown for orders created before it was recorded
     branch: Branch
     product: Product # The product that was ordered
     stock_lots: List[StockLot] = [] # The lots generated by this order
 
     class Config: from_attributes = True
 
+class InboundBatchLineResult(BaseModel):
+    line: int # Position of the line in the request
+    product_id: int
+    quantity: int
+    inbound_order_id: int
+    stock_lot_id: int
+
+class InboundBatchResult(BaseModel):
+    branch_id: int
+    lines: List[InboundBatchLineResult]
+
 class OutboundOrder(OutboundOrderBase):
     id: int
     user_id: int
+    created_at: Optional[datetime] = None # Unknown for orders created before it was recorded
     branch: Branch
     product: Product
     user: User
+    allocations: List[StockLotAllocation] = [] # Lots consumed by this order (only set on creation)
 
     class Config: from_attributes = True
 
+class StockLotInspectionResult(BaseModel):
+    lot_id: int
+    ok: bool
+    status: Optional[StockLotStatus] = None
+    quantity: Optional[int] = None
+    error: Optional[str] = None # Why the lot was not inspected
+
+class StockLotInspectionBatchResult(BaseModel):
+    inspected: int
+    failed: int
+    results: List[StockLotInspectionResult] # In request order
+
+# --- Quality Dashboard Schemas ---
+
+class PendingAgeBucket(str, enum.Enum):
+    UNDER_24H = "under_24h"
+    ONE_TO_THREE_DAYS = "1_to_3_days"
+    OVER_3_DAYS = "over_3_days"
+
+class PendingLotRow(BaseModel):
+    """One PENDING lot as shown on the QC dashboard (flat, no nested objects)."""
+    id: int
+    quantity: int
+    created_at: datetime
+    age_bucket: PendingAgeBucket
+    product_id: int
+    product_name: str
+    branch_id: int
+    branch_name: str
+    created_by: Optional[str] = None
+
+# --- Inventory History Schemas ---
+
+class InventoryLine(BaseModel):
+    branch_id: int
+    product_id: int
+    status: StockLotStatus
+    quantity: int
+
+class InventoryAsOf(BaseModel):
+    as_of: datetime
+    snapshot_id: Optional[int] = None # Snapshot the answer starts from, None if only the ledger was replayed
+    snapshot_taken_at: Optional[datetime] = None
+    lines: List[InventoryLine]
+
+class InventorySnapshot(BaseModel):
+    id: int
+    taken_at: datetime
+    last_movement_id: int
+
+    class Config: from_attributes = True
+
+# --- Export Schemas ---
+
+class ExportFormat(str, enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
 # --- Password & Token Schemas ---
 
 class PasswordChange(BaseModel):
@@ -138,3 +286,16 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+
+# --- Authorization Schemas ---
+
+class Principal(BaseModel):
+    """The authenticated user as needed by authorization checks (cached per token subject)."""
+    id: int
+    email: str
+    is_active: bool
+    profile: UserProfile
+    branch_ids: FrozenSet[int] = frozenset()
+    token_version: int = 0
+
+    class Config: from_attributes = True
@@ -1,7 +1,13 @@
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
 from passlib.context import CryptContext
 from jose import JWTError, jwt
+import asyncio
 import os
+import threading
+
+from app.core import schemas
 
 SECRET_KEY = os.getenv("SECRET_KEY", "a_default_secret_key_for_development")
 ALGORITHM = "HS256"
@@ -15,6 +21,98 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# --- Bounded Password Hashing Pool ---
+# bcrypt is CPU bound on purpose. Running it on a small dedicated pool keeps login
+# storms from occupying every worker thread; once the queue is full, callers get
+# PasswordHashingBusy (mapped to 503) instead of piling up.
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+PASSWORD_HASH_USE_PROCESSES = os.getenv("PASSWORD_HASH_USE_PROCESSES", "false").lower() == "true"
+
+class PasswordHashingBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+class PasswordHashPool:
+    def __init__(self, workers: int, max_queue: int, use_processes: bool = False):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHashingBusy()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Future):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def run(self, fn, *args):
+        """Runs `fn` on the pool and waits for it (for sync endpoints)."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """Runs `fn` on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "executor": "process" if self.use_processes else "thread",
+                "running": min(in_flight, self.workers),
+                "queued": max(in_flight - self.workers, 0),
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+password_pool = PasswordHashPool(
+    workers=PASSWORD_HASH_WORKERS,
+    max_queue=PASSWORD_HASH_MAX_QUEUE,
+    use_processes=PASSWORD_HASH_USE_PROCESSES,
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.run_async(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -24,3 +122,29 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+# --- Principal Claims ---
+
+def principal_claims(principal: schemas.Principal) -> dict:
+    """Claims that let a token be authorized without loading the user."""
+    return {
+        "sub": principal.email,
+        "uid": principal.id,
+        "profile": principal.profile.value,
+        "branches": sorted(principal.branch_ids),
+        "active": principal.is_active,
+        "ver": principal.token_version,
+    }
+
+def principal_from_claims(payload: dict) -> Optional[schemas.Principal]:
+    """Rebuilds the principal from a decoded token; None for tokens without the claims."""
+    if not all(claim in payload for claim in ("uid", "profile", "branches", "active", "ver")):
+        return None
+    return schemas.Principal(
+        id=payload["uid"],
+        email=payload["sub"],
+        is_active=payload["active"],
+        profile=payload["profile"],
+        branch_ids=payload["branches"],
+        token_version=payload["ver"],
+    )
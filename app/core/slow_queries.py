@@ -0,0 +1,203 @@
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.core.instrumentation import current_request
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: statements slower than SLOW_QUERY_MS are logged and kept in a bounded
+# in-memory ring (read through /api/metrics/slow-queries). A sample of the slow
+# SELECTs is re-run under EXPLAIN (ANALYZE, BUFFERS) on a separate connection by
+# a background thread, so plans can be read without database superuser access.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0")) # 0 disables the log
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1"))
+SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS", "60"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+SLOW_QUERY_RING_SIZE = int(os.getenv("SLOW_QUERY_RING_SIZE", "200"))
+
+SENSITIVE_PARAMETER = re.compile(r"pass|secret|token|hash", re.IGNORECASE)
+MAX_PARAMETER_LENGTH = 64
+
+# --- Normalization & Redaction ---
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|:\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_ROWS = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+_WRITE_KEYWORD = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+_LOCKING_CLAUSE = re.compile(
+    r"\s+FOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)(?:\s+OF\s+[\w.]+(?:\s*,\s*[\w.]+)*)?(?:\s+NOWAIT|\s+SKIP\s+LOCKED)?\s*$",
+    re.IGNORECASE,
+)
+
+def normalize_sql(statement: str) -> str:
+    """Statement with literals and placeholders replaced by `?` and lists collapsed, for grouping."""
+    normalized = " ".join(statement.split())
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(...)", normalized)
+    return _VALUES_ROWS.sub(r"\1, ...", normalized)
+
+def redact_value(name, value):
+    if name is not None and SENSITIVE_PARAMETER.search(str(name)):
+        return "<redacted>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > MAX_PARAMETER_LENGTH:
+        return value[:MAX_PARAMETER_LENGTH] + f"... ({len(value)} chars)"
+    if isinstance(value, (list, tuple)) and len(value) > 10:
+        return [redact_value(None, item) for item in value[:10]] + [f"... ({len(value)} items)"]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+def redact_parameters(parameters, executemany: bool):
+    """Parameters safe to log: secrets hidden, long values truncated; executemany keeps the first row."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "first": redact_parameters(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: redact_value(name, value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_value(None, value) for value in parameters]
+    return parameters
+
+# --- Slow Query Ring & EXPLAIN Worker ---
+
+class SlowQueryLog:
+    def __init__(self, size: int = SLOW_QUERY_RING_SIZE):
+        self._entries: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._explained_at: Dict[str, float] = {}
+        self._explain_queue: queue.Queue = queue.Queue(maxsize=100)
+        self._explain_engine: Optional[Engine] = None
+        self._worker: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.explained = 0
+
+    def record(self, entry: dict, explain_url=None, statement: Optional[str] = None, parameters=None) -> None:
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+            if explain_url is None or not self._should_explain(entry["statement"]):
+                return
+            if self._worker is None:
+                self._explain_engine = create_engine(explain_url, poolclass=NullPool)
+                self._worker = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+                self._worker.start()
+        entry["plan"] = "pending"
+        try:
+            self._explain_queue.put_nowait((entry, statement, parameters))
+        except queue.Full:
+            entry["plan"] = None # EXPLAINs are best effort
+
+    def _should_explain(self, normalized: str) -> bool:
+        """Sampled, and at most once per cooldown for each normalized statement."""
+        if random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            return False
+        now = time.monotonic()
+        if now - self._explained_at.get(normalized, float("-inf")) < SLOW_QUERY_EXPLAIN_COOLDOWN_SECONDS:
+            return False
+        self._explained_at[normalized] = now
+        return True
+
+    def _run(self) -> None:
+        while True:
+            entry, statement, parameters = self._explain_queue.get()
+            try:
+                entry["plan"] = self._explain(statement, parameters)
+                with self._lock:
+                    self.explained += 1
+            except Exception as exc:
+                entry["plan"] = None
+                entry["explain_error"] = str(exc).strip().splitlines()[0]
+
+    def _explain(self, statement: str, parameters) -> str:
+        # EXPLAIN ANALYZE executes the query: only reads get here, the row lock
+        # clause is dropped so the side connection never waits on the request's
+        # own locks, and everything is rolled back.
+        connection = self._explain_engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + _LOCKING_CLAUSE.sub("", statement), parameters)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            connection.rollback()
+            connection.close()
+
+    def entries(self) -> List[dict]:
+        """Newest first."""
+        with self._lock:
+            return [dict(entry) for entry in reversed(self._entries)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"recorded": self.recorded, "explained": self.explained, "kept": len(self._entries)}
+
+
+slow_query_log = SlowQueryLog()
+
+# --- Engine Hooks ---
+
+def is_explainable(statement: str, executemany: bool) -> bool:
+    """Plain reads only: EXPLAIN ANALYZE would run the writes of anything else (CTEs included)."""
+    if executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return False
+    return not _WRITE_KEYWORD.search(_LOCKING_CLAUSE.sub("", statement))
+
+def install(engine: Engine, threshold_ms: float = SLOW_QUERY_MS) -> None:
+    """
+    Times every statement on `engine` and records those slower than
+    `threshold_ms`. EXPLAIN sampling needs psycopg2 (asyncpg statements use
+    another parameter style), so slow statements from other drivers are only logged.
+    """
+    if threshold_ms <= 0:
+        return
+    explain_url = engine.url if engine.dialect.driver == "psycopg2" else None
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None: # Per statement, so failed statements leave nothing on the connection
+            context._slow_query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _check_duration(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms < threshold_ms:
+            return
+
+        request = current_request.get()
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed_ms, 2),
+            "route": f"{request.scope.get('method')} {request.route}" if request is not None else None,
+            "statement": normalize_sql(statement),
+            "parameters": redact_parameters(parameters, executemany),
+            "plan": None,
+        }
+        logger.warning("Slow query (%.1f ms) on %s: %s params=%s", elapsed_ms, entry["route"], entry["statement"], entry["parameters"])
+        explainable = explain_url is not None and is_explainable(statement, executemany)
+        slow_query_log.record(
+            entry,
+            explain_url=explain_url if explainable else None,
+            statement=statement,
+            parameters=parameters,
+        )
@@ -0,0 +1,137 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, text, union_all
+from sqlalchemy.orm import Session
+
+from app.core import ledger, models
+
+logger = logging.getLogger(__name__)
+
+inventory_movements = models.InventoryMovement.__table__
+snapshot_lines = models.InventorySnapshotLine.__table__
+
+# Advisory lock taken by whichever process writes the scheduled snapshot, so
+# several API workers running the scheduler produce one snapshot per interval.
+SNAPSHOT_LOCK_KEY = 0x57D5_0001
+
+# --- As-of Queries ---
+
+def latest_snapshot(db: Session, at: datetime) -> Optional[models.InventorySnapshot]:
+    return db.scalars(
+        select(models.InventorySnapshot)
+        .where(models.InventorySnapshot.taken_at <= at)
+        .order_by(models.InventorySnapshot.taken_at.desc())
+        .limit(1)
+    ).first()
+
+
+def stock_as_of(
+    db: Session,
+    at: datetime,
+    branch_ids: Optional[Sequence[int]] = None,
+    product_id: Optional[int] = None,
+) -> Tuple[Optional[models.InventorySnapshot], List[dict]]:
+    """
+    Stock per branch, product and status at `at`: the nearest snapshot taken
+    before it plus the ledger movements recorded after that snapshot, up to `at`.
+    Returns the snapshot used (None if there is none yet) and the non-zero lines.
+    """
+    snapshot = latest_snapshot(db, at)
+
+    later = select(
+        inventory_movements.c.branch_id,
+        inventory_movements.c.product_id,
+        inventory_movements.c.status,
+        inventory_movements.c.quantity,
+    ).where(inventory_movements.c.created_at <= at)
+    if snapshot is not None:
+        later = later.where(inventory_movements.c.id > snapshot.last_movement_id)
+    if branch_ids is not None:
+        later = later.where(inventory_movements.c.branch_id.in_(branch_ids))
+    if product_id is not None:
+        later = later.where(inventory_movements.c.product_id == product_id)
+
+    parts = [later]
+    if snapshot is not None:
+        base = select(
+            snapshot_lines.c.branch_id,
+            snapshot_lines.c.product_id,
+            snapshot_lines.c.status,
+            snapshot_lines.c.quantity,
+        ).where(snapshot_lines.c.snapshot_id == snapshot.id)
+        if branch_ids is not None:
+            base = base.where(snapshot_lines.c.branch_id.in_(branch_ids))
+        if product_id is not None:
+            base = base.where(snapshot_lines.c.product_id == product_id)
+        parts.append(base)
+
+    combined = union_all(*parts).subquery("combined")
+    total = func.sum(combined.c.quantity)
+    rows = db.execute(
+        select(combined.c.branch_id, combined.c.product_id, combined.c.status, total.label("quantity"))
+        .group_by(combined.c.branch_id, combined.c.product_id, combined.c.status)
+        .having(total != 0)
+        .order_by(combined.c.branch_id, combined.c.product_id, combined.c.status)
+    ).all()
+    return snapshot, [dict(row._mapping) for row in rows]
+
+# --- Scheduled Snapshots ---
+
+def take_snapshot_if_due(db: Session, interval: float) -> Optional[models.InventorySnapshot]:
+    """
+    Takes a snapshot if none was taken in the last `interval` seconds and no
+    other process is taking one right now. The caller commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        if not db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SNAPSHOT_LOCK_KEY}):
+            return None
+
+    last_taken_at = db.scalar(select(func.max(models.InventorySnapshot.taken_at)))
+    if last_taken_at is not None and (datetime.now(timezone.utc) - last_taken_at).total_seconds() < interval:
+        return None
+    return ledger.take_snapshot(db)
+
+
+class SnapshotScheduler:
+    """Background thread writing an inventory snapshot every `interval` seconds."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, interval: float) -> None:
+        if self._thread is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="inventory-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        from app.core.database import SessionLocal
+
+        # Wake up more often than the interval so a restart does not delay the next snapshot by a full period.
+        check_every = min(interval, 60.0)
+        while not self._stop.wait(check_every):
+            db = SessionLocal()
+            try:
+                snapshot = take_snapshot_if_due(db, interval)
+                db.commit()
+                if snapshot is not None:
+                    logger.info("Inventory snapshot %s taken up to movement %s", snapshot.id, snapshot.last_movement_id)
+            except Exception:
+                db.rollback()
+                logger.exception("Could not take the inventory snapshot")
+            finally:
+                db.close()
+
+
+snapshot_scheduler = SnapshotScheduler()
@@ -0,0 +1,139 @@
+import os
+from collections import defaultdict
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core import models
+
+stock_balances = models.StockBalance.__table__
+stock_lots = models.StockLot.__table__
+
+BalanceDelta = Tuple[int, int, models.StockLotStatus, int]  # (product_id, branch_id, status, delta)
+
+# Rows each balance is spread over. A transaction writes its deltas to the shard
+# of its connection, so concurrent picks of one SKU update different rows instead
+# of queueing on a single one; readers SUM the shards.
+STOCK_BALANCE_SHARDS = int(os.getenv("STOCK_BALANCE_SHARDS", "16"))
+
+# --- Incremental Maintenance ---
+
+def summed(*keys):
+    """Balances added up over their shards, grouped by `keys`."""
+    return select(*keys, func.sum(stock_balances.c.quantity).label("quantity")).group_by(*keys)
+
+
+def apply_deltas(db: Session, deltas: Iterable[BalanceDelta]) -> None:
+    """
+    Adds the given quantity deltas to the balances in the current transaction.
+    Must be called next to every change of stock_lots.quantity/status so both
+    commit (or roll back) together. A single shard may go negative; only the
+    sum over the shards is the balance.
+    """
+    totals = defaultdict(int)
+    for product_id, branch_id, status, delta in deltas:
+        totals[(product_id, branch_id, status)] += delta
+
+    # Sorted so concurrent transactions lock balance rows in the same order.
+    shard = func.pg_backend_pid() % STOCK_BALANCE_SHARDS
+    rows = [
+        {"product_id": product_id, "branch_id": branch_id, "status": status, "shard": shard, "quantity": delta}
+        for (product_id, branch_id, status), delta in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1], item[0][2].value))
+        if delta
+    ]
+    if not rows:
+        return
+
+    stmt = pg_insert(stock_balances).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            stock_balances.c.product_id, stock_balances.c.branch_id, stock_balances.c.status, stock_balances.c.shard,
+        ],
+        set_={"quantity": stock_balances.c.quantity + stmt.excluded.quantity},
+    )
+    db.execute(stmt)
+
+
+def apply_delta(db: Session, product_id: int, branch_id: int, status: models.StockLotStatus, delta: int) -> None:
+    apply_deltas(db, [(product_id, branch_id, status, delta)])
+
+
+def get_quantity(db: Session, product_id: int, branch_id: int, status: models.StockLotStatus) -> int:
+    """Primary-key range lookup of a single balance, summed over its shards."""
+    return db.execute(
+        select(func.sum(stock_balances.c.quantity)).where(
+            stock_balances.c.product_id == product_id,
+            stock_balances.c.branch_id == branch_id,
+            stock_balances.c.status == status,
+        )
+    ).scalar() or 0
+
+# --- Reconciliation ---
+
+def find_drift(db: Session) -> List[dict]:
+    """
+    Compares the balances with SUM(quantity) over stock_lots and returns the
+    keys whose values differ, as dicts with `expected` and `recorded` quantities.
+    """
+    expected = (
+        select(
+            stock_lots.c.product_id,
+            stock_lots.c.branch_id,
+            stock_lots.c.status,
+            func.sum(stock_lots.c.quantity).label("quantity"),
+        )
+        .group_by(stock_lots.c.product_id, stock_lots.c.branch_id, stock_lots.c.status)
+        .subquery("expected")
+    )
+    recorded = summed(
+        stock_balances.c.product_id, stock_balances.c.branch_id, stock_balances.c.status
+    ).subquery("recorded")
+    joined = expected.outerjoin(
+        recorded,
+        and_(
+            expected.c.product_id == recorded.c.product_id,
+            expected.c.branch_id == recorded.c.branch_id,
+            expected.c.status == recorded.c.status,
+        ),
+        full=True,
+    )
+    expected_quantity = func.coalesce(expected.c.quantity, 0)
+    recorded_quantity = func.coalesce(recorded.c.quantity, 0)
+    rows = db.execute(
+        select(
+            func.coalesce(expected.c.product_id, recorded.c.product_id).label("product_id"),
+            func.coalesce(expected.c.branch_id, recorded.c.branch_id).label("branch_id"),
+            func.coalesce(expected.c.status, recorded.c.status).label("status"),
+            expected_quantity.label("expected"),
+            recorded_quantity.label("recorded"),
+        )
+        .select_from(joined)
+        .where(expected_quantity != recorded_quantity)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def rebuild(db: Session) -> List[dict]:
+    """
+    Rebuilds every balance from stock_lots, into a single shard, and returns the
+    drift that was found. The table is locked against concurrent deltas until the caller commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE stock_balances IN SHARE ROW EXCLUSIVE MODE"))
+
+    drift = find_drift(db)
+    db.execute(delete(stock_balances))
+    db.execute(
+        insert(stock_balances).from_select(
+            ["product_id", "branch_id", "status", "quantity"],
+            select(
+                stock_lots.c.product_id,
+                stock_lots.c.branch_id,
+                stock_lots.c.status,
+                func.sum(stock_lots.c.quantity),
+            ).group_by(stock_lots.c.product_id, stock_lots.c.branch_id, stock_lots.c.status),
+        )
+    )
+    return drift
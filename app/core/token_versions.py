@@ -0,0 +1,72 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core import models
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVersionTable:
+    """
+    In-process copy of users.token_version, refreshed in the background.
+    A token whose `ver` claim matches the known version can be trusted without
+    a database lookup; bumping a user's version revokes older tokens.
+    """
+
+    def __init__(self):
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, user_id: int) -> Optional[int]:
+        return self._versions.get(user_id)
+
+    def set(self, user_id: int, version: int) -> None:
+        """Records a version bump made by this process, before the next refresh."""
+        with self._lock:
+            self._versions[user_id] = max(version, self._versions.get(user_id, version))
+
+    def refresh(self, db: Session) -> None:
+        rows = db.execute(select(models.User.id, models.User.token_version)).all()
+        with self._lock:
+            # Versions only grow, so keep local bumps a stale snapshot has not seen yet.
+            self._versions = {
+                user_id: max(version, self._versions.get(user_id, version))
+                for user_id, version in rows
+            }
+
+    # --- Background Refresh ---
+
+    def start(self, interval: float) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="token-version-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        from app.core.database import SessionLocal
+
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                self.refresh(db)
+            except Exception:
+                logger.exception("Could not refresh token versions")
+            finally:
+                db.close()
+            self._stop.wait(interval)
+
+
+token_versions = TokenVersionTable()
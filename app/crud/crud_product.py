@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate
@@ -8,8 +10,12 @@ def get_product_by_sku(db: Session, sku: str):
 def get_product(db: Session, product_id: int):
     return db.query(Product).filter(Product.id == product_id).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Product).offset(skip).limit(limit).all()
+def get_products(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    query = db.query(Product).order_by(Product.id)
+    if after_id is not None:
+        # Keyset page: rows after the last id of the previous page
+        return query.filter(Product.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def create_product(db: Session, product: ProductCreate):
     db_product = Product(
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 from app.models.vendor import Vendor
 from app.schemas.vendor import VendorCreate, VendorUpdate
@@ -5,8 +7,11 @@ from app.schemas.vendor import VendorCreate, VendorUpdate
 def get_vendor(db: Session, vendor_id: int):
     return db.query(Vendor).filter(Vendor.id == vendor_id).first()
 
-def get_vendors(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Vendor).offset(skip).limit(limit).all()
+def get_vendors(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    query = db.query(Vendor).order_by(Vendor.id)
+    if after_id is not None:
+        return query.filter(Vendor.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 def create_vendor(db: Session, vendor: VendorCreate):
     db_vendor = Vendor(**vendor.dict())
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from sqlalchemy.orm import Session
 
 from app.models.dock import Dock
@@ -8,8 +10,11 @@ def get_dock(db: Session, dock_id: int) -> Dock:
     return db.query(Dock).filter(Dock.id == dock_id).first()
 
 
-def get_docks(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Dock).offset(skip).limit(limit).all()
+def get_docks(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    query = db.query(Dock).order_by(Dock.id)
+    if after_id is not None:
+        return query.filter(Dock.id > after_id).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 
 def create_dock(db: Session, dock: DockCreate) -> Dock:
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from dotenv import load_dotenv
 import os
@@ -8,19 +9,53 @@ load_dotenv()
 # Import all routers
 from app.api.endpoints import (
     auth, products, inbound, outbound, users, branches, quality, vendors, purchase_orders, purchase_order_items,
-    inbound_shipments, inbound_shipment_items, docks
+    inbound_shipments, inbound_shipment_items, docks, metrics, inventory, events, exports, inbound_async, outbound_async, quality_async
 )
 
+from app.core.database import async_engine
+from app.core.events import pg_bridge
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.security import password_pool
+from app.core.snapshots import snapshot_scheduler
+from app.core.token_versions import token_versions
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the in-process token version table fresh so revoked tokens stop working
+    token_versions.start(interval=float(os.getenv("TOKEN_VERSION_REFRESH_SECONDS", "5")))
+    # Periodic inventory snapshots for as-of queries (0 disables, e.g. when run from cron instead)
+    snapshot_scheduler.start(interval=float(os.getenv("INVENTORY_SNAPSHOT_INTERVAL_SECONDS", "3600")))
+    # Relay stock events committed by other workers (EVENTS_PG_BRIDGE=true; no-op otherwise)
+    pg_bridge.start()
+    yield
+    pg_bridge.stop()
+    snapshot_scheduler.stop()
+    token_versions.stop()
+    password_pool.shutdown()
+    await async_engine.dispose()
+
 app = FastAPI(
     title="WMS Enterprise API",
     description="Warehouse Management System (WMS) for quality control and stock management.",
     version="0.2.0",
+    lifespan=lifespan,
 )
 
+# Per-route latency, SQL count/time and Server-Timing headers (served on /metrics)
+app.add_middleware(InstrumentationMiddleware)
+
+# Routers named in WMS_ASYNC_ROUTERS (comma separated: inbound, outbound, quality)
+# are served by their async twins. The twin is registered first, so any route it
+# does not define still falls through to the sync router; twins share the sync
+# routes' contract and are left out of the OpenAPI schema.
+ASYNC_ROUTERS = {name.strip() for name in os.getenv("WMS_ASYNC_ROUTERS", "").split(",") if name.strip()}
+
 # Include routers with appropriate prefixes and tags
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api", tags=["Users"])
 app.include_router(branches.router, prefix="/api", tags=["Branches"])
+if "quality" in ASYNC_ROUTERS:
+    app.include_router(quality_async.router, prefix="/api", tags=["Quality Control"], include_in_schema=False)
 app.include_router(quality.router, prefix="/api", tags=["Quality Control"])
 app.include_router(products.router, prefix="/api/products", tags=["Products"])
 app.include_router(vendors.router, prefix="/api/vendors", tags=["Vendors"])
@@ -29,8 +64,17 @@ app.include_router(purchase_order_items.router, prefix="/api", tags=["Purchase O
 app.include_router(inbound_shipments.router, prefix="/api", tags=["Inbound Shipments"])
 app.include_router(inbound_shipment_items.router, prefix="/api", tags=["Inbound Shipment Items"])
 app.include_router(docks.router, prefix="/api/docks", tags=["Docks"])
+if "inbound" in ASYNC_ROUTERS:
+    app.include_router(inbound_async.router, prefix="/wms", tags=["Inbound Operations"], include_in_schema=False)
 app.include_router(inbound.router, prefix="/wms", tags=["Inbound Operations"])
+if "outbound" in ASYNC_ROUTERS:
+    app.include_router(outbound_async.router, prefix="/wms", tags=["Outbound Operations"], include_in_schema=False)
 app.include_router(outbound.router, prefix="/wms", tags=["Outbound Operations"])
+app.include_router(inventory.router, prefix="/wms", tags=["Inventory"])
+app.include_router(events.router, prefix="/wms", tags=["Events"])
+app.include_router(exports.router, prefix="/wms", tags=["Exports"])
+app.include_router(metrics.router, prefix="/api", tags=["Metrics"])
+app.include_router(metrics.prometheus_router, tags=["Metrics"])
 
 @app.get("/", tags=["Root"], summary="Check if the API is online")
 def read_root():
@@ -0,0 +1,343 @@
+import argparse
+import csv
+import enum
+import io
+import math
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from .core.database import SessionLocal
+from .core import ledger, models, stock_balance
+from .core.security import get_password_hash
+
+# Fills branches, users, products, inbound orders, stock lots and outbound
+# orders with skewed data for scale tests. The same seed (and `as_of` date)
+# always produces the same rows.
+DEFAULT_PASSWORD = "synthetic123" # Shared by every generated user: hashing one per user would dominate small runs
+COPY_BATCH_SIZE = 100000 # Rows buffered per COPY (or executemany) round trip
+
+# --- Distributions ---
+SKU_SKEW = 1.1 # Zipf exponent of product popularity: a few hot SKUs take most of the lots
+BRANCH_SKEW = 0.8 # Zipf exponent of branch size
+ARRIVAL_SKEW = 1.5 # >1: receipts get denser towards `as_of` (growing business)
+MEAN_LOTS_PER_ORDER = 3 # Geometric: most inbound orders make one or two lots, some many
+LOT_QUANTITY_MU, LOT_QUANTITY_SIGMA = 3.5, 1.0 # Log-normal lot size (median ~33 units)
+SHELF_DAYS = 30 # Mean age at which an AVAILABLE lot is used up; older survivors form the long tail
+PARTIAL_PICK_SHARE = 0.4 # Of the lots still in stock, share already partly picked
+PENDING_WINDOW_DAYS = 3 # Lots younger than this may still wait for inspection
+QUARANTINE_SHARE = 0.01
+MEAN_OUTBOUND_QUANTITY = 60 # Picked units are grouped into outbound orders of about this size
+ADMIN_SHARE, SUPERVISOR_SHARE = 0.02, 0.2
+
+stock_lots = models.StockLot.__table__
+inbound_orders = models.InboundOrder.__table__
+outbound_orders = models.OutboundOrder.__table__
+
+STOCK_LOT_COLUMNS = ("product_id", "branch_id", "inbound_order_id", "quantity", "status", "created_at", "inspected_at", "created_by_user_id")
+INBOUND_ORDER_COLUMNS = ("id", "product_id", "quantity", "user_id", "branch_id", "created_at")
+OUTBOUND_ORDER_COLUMNS = ("product_id", "quantity", "user_id", "branch_id", "created_at")
+
+def zipf_cum_weights(count: int, skew: float) -> List[float]:
+    """Cumulative weights of ranks 1..count under a Zipf law, for random.choices or bisect."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+def pick(rng: random.Random, cum_weights: Sequence[float]) -> int:
+    return bisect(cum_weights, rng.random() * cum_weights[-1])
+
+# --- Bulk Writes ---
+
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, enum.Enum):
+        return value.name # Enum columns store member names
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+class BulkWriter:
+    """
+    Buffers rows for one table and writes them with COPY on psycopg2 (or
+    executemany elsewhere) every COPY_BATCH_SIZE rows. The writer of a parent
+    table (`parent`) is flushed first, so foreign keys always resolve.
+    """
+
+    def __init__(self, db: Session, table, columns: Sequence[str], parent: Optional["BulkWriter"] = None):
+        self.db = db
+        self.table = table
+        self.columns = columns
+        self.parent = parent
+        self.rows: List[tuple] = []
+        self.written = 0
+        self.use_copy = db.get_bind().dialect.driver == "psycopg2"
+
+    def add(self, row: tuple) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= COPY_BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.parent is not None:
+            self.parent.flush()
+        if not self.rows:
+            return
+        if self.use_copy:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows([copy_value(value) for value in row] for row in self.rows)
+            buffer.seek(0)
+            cursor = self.db.connection().connection.driver_connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {self.table.name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+                )
+            finally:
+                cursor.close()
+        else:
+            self.db.execute(insert(self.table), [dict(zip(self.columns, row)) for row in self.rows])
+        self.written += len(self.rows)
+        self.rows = []
+
+# --- Dataset ---
+
+def branch_name(prefix: str, index: int) -> str:
+    return f"{prefix}-branch-{index}"
+
+def user_email(prefix: str, index: int) -> str:
+    return f"{prefix}-user-{index}@example.com"
+
+def dataset_branch_ids(db: Session, prefix: str) -> List[int]:
+    return db.scalars(
+        select(models.Branch.id).where(models.Branch.name.like(f"{prefix}-branch-%")).order_by(models.Branch.id)
+    ).all()
+
+def drop(db: Session, prefix: str) -> None:
+    """Deletes a dataset generated with `prefix` (and anything recorded against its branches since)."""
+    branch_ids = dataset_branch_ids(db, prefix)
+    if branch_ids:
+        for model in (
+            models.InventorySnapshotLine, models.InventoryMovement, models.StockReservation, models.StockLot,
+            models.OutboundOrder, models.InboundOrder, models.StockBalance, models.Product,
+        ):
+            db.execute(delete(model.__table__).where(model.__table__.c.branch_id.in_(branch_ids)))
+        db.execute(delete(models.user_branch_association).where(models.user_branch_association.c.branch_id.in_(branch_ids)))
+        db.execute(delete(models.Branch.__table__).where(models.Branch.id.in_(branch_ids)))
+    user_ids = select(models.User.id).where(models.User.email.like(f"{prefix}-user-%@example.com")).scalar_subquery()
+    db.execute(delete(models.user_branch_association).where(models.user_branch_association.c.user_id.in_(user_ids)))
+    db.execute(delete(models.User.__table__).where(models.User.id.in_(user_ids)))
+
+def create_branches_and_users(
+    db: Session, rng: random.Random, prefix: str, branch_count: int, user_count: int, password: str
+) -> Tuple[List[int], Dict[int, List[int]]]:
+    """
+    Creates the branches and users; returns (branch ids, user ids with access
+    to each branch). User 0 is an admin; most users see one or two branches,
+    supervisors many (Pareto tail), admins all.
+    """
+    branch_ids = db.scalars(
+        insert(models.Branch.__table__).returning(models.Branch.id, sort_by_parameter_order=True),
+        [{"name": branch_name(prefix, i), "location": f"Synthetic region {i % 10}"} for i in range(branch_count)],
+    ).all()
+
+    hashed_password = get_password_hash(password)
+    profiles = []
+    for i in range(user_count):
+        roll = rng.random()
+        if i == 0 or roll < ADMIN_SHARE:
+            profiles.append(models.UserProfile.ADMIN)
+        elif roll < ADMIN_SHARE + SUPERVISOR_SHARE:
+            profiles.append(models.UserProfile.SUPERVISOR)
+        else:
+            profiles.append(models.UserProfile.OPERATOR)
+    user_ids = db.scalars(
+        insert(models.User.__table__).returning(models.User.id, sort_by_parameter_order=True),
+        [
+            {"email": user_email(prefix, i), "hashed_password": hashed_password, "is_active": True, "profile": profile}
+            for i, profile in enumerate(profiles)
+        ],
+    ).all()
+
+    users_by_branch: Dict[int, List[int]] = {branch_id: [] for branch_id in branch_ids}
+    for user_id, profile in zip(user_ids, profiles):
+        if profile == models.UserProfile.ADMIN:
+            assigned = branch_ids
+        else:
+            tail = rng.paretovariate(1.2) * (4 if profile == models.UserProfile.SUPERVISOR else 1)
+            assigned = rng.sample(branch_ids, min(branch_count, int(tail)))
+        for branch_id in assigned:
+            users_by_branch[branch_id].append(user_id)
+    db.execute(insert(models.user_branch_association), [
+        {"user_id": user_id, "branch_id": branch_id}
+        for branch_id, members in users_by_branch.items() for user_id in members
+    ])
+    return list(branch_ids), users_by_branch
+
+def create_products(db: Session, prefix: str, branch_ids: Sequence[int], product_count: int) -> Dict[int, List[int]]:
+    """The same catalog in every branch; returns each branch's product ids in popularity order."""
+    products = {}
+    for branch_id in branch_ids:
+        products[branch_id] = db.scalars(
+            insert(models.Product.__table__).returning(models.Product.id, sort_by_parameter_order=True),
+            [
+                {"name": f"{prefix}-sku-{rank:06d}", "description": f"Synthetic SKU of popularity rank {rank}", "branch_id": branch_id}
+                for rank in range(product_count)
+            ],
+        ).all()
+    return products
+
+def reserve_inbound_order_ids(db: Session) -> int:
+    """
+    First free inbound order id. Lots reference their order, so orders get
+    explicit ids (COPY returns none); writes to the table are locked out until
+    commit and the id sequence is moved past them in `finish_inbound_order_ids`.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE inbound_orders IN SHARE ROW EXCLUSIVE MODE"))
+    return (db.scalar(select(func.max(inbound_orders.c.id))) or 0) + 1
+
+def finish_inbound_order_ids(db: Session) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(
+            "SELECT setval(pg_get_serial_sequence('inbound_orders', 'id'), "
+            "(SELECT COALESCE(MAX(id), 1) FROM inbound_orders))"
+        ))
+
+def generate(
+    db: Session,
+    seed: int = 42,
+    prefix: str = "synthetic",
+    branches: int = 10,
+    users: int = 100,
+    products: int = 1000,
+    lots: int = 100000,
+    days: int = 365,
+    as_of: Optional[datetime] = None,
+    password: str = DEFAULT_PASSWORD,
+) -> dict:
+    """
+    Generates a dataset and its inventory ledger and balances in the caller's
+    transaction (not committed).
+    - `products` per branch, ranked by a Zipf popularity shared by all branches.
+    - `lots` spread over branches (Zipf sizes) and over `days` of receipts up to
+      `as_of`; old lots are mostly used up, leaving a long tail of leftovers.
+    - Picked quantities become the outbound orders.
+    Returns the row counts.
+    """
+    rng = random.Random(seed)
+    as_of = as_of or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+
+    branch_ids, users_by_branch = create_branches_and_users(db, rng, prefix, branches, users, password)
+    products_by_branch = create_products(db, prefix, branch_ids, products)
+    branch_weights = zipf_cum_weights(branches, BRANCH_SKEW)
+    sku_weights = zipf_cum_weights(products, SKU_SKEW)
+
+    order_writer = BulkWriter(db, inbound_orders, INBOUND_ORDER_COLUMNS)
+    lot_writer = BulkWriter(db, stock_lots, STOCK_LOT_COLUMNS, parent=order_writer)
+    outbound_writer = BulkWriter(db, outbound_orders, OUTBOUND_ORDER_COLUMNS)
+    next_order_id = reserve_inbound_order_ids(db)
+    picked: Dict[Tuple[int, int], List] = {} # (branch, product) -> [units picked not yet in an order, last pick time]
+    order_sizes = {}
+
+    lot_index = reported = 0
+    while lot_index < lots:
+        # Receipts are generated oldest first, so ids follow created_at as they do in production.
+        age_days = days * (1 - lot_index / lots) ** ARRIVAL_SKEW
+        created_at = as_of - timedelta(days=age_days)
+        branch_id = branch_ids[pick(rng, branch_weights)]
+        product_id = products_by_branch[branch_id][pick(rng, sku_weights)]
+        receiver_id = rng.choice(users_by_branch[branch_id])
+        lot_count = min(lots - lot_index, 1 + int(math.log(1 - rng.random()) / math.log(1 - 1 / MEAN_LOTS_PER_ORDER)))
+
+        order_quantity = 0
+        for _ in range(lot_count):
+            quantity = max(1, int(rng.lognormvariate(LOT_QUANTITY_MU, LOT_QUANTITY_SIGMA)))
+            order_quantity += quantity
+            remaining, status, inspected_at = quantity, models.StockLotStatus.AVAILABLE, None
+            if age_days < PENDING_WINDOW_DAYS and rng.random() > age_days / PENDING_WINDOW_DAYS:
+                status = models.StockLotStatus.PENDING
+            else:
+                inspected_at = min(as_of, created_at + timedelta(hours=rng.uniform(1, 48)))
+                if rng.random() < QUARANTINE_SHARE:
+                    status = models.StockLotStatus.QUARANTINED
+                elif rng.random() < 1 - math.exp(-age_days / SHELF_DAYS):
+                    remaining = 0
+                elif rng.random() < PARTIAL_PICK_SHARE and quantity > 1:
+                    remaining = rng.randint(1, quantity - 1)
+            if remaining < quantity:
+                picked_at = min(as_of, inspected_at + (as_of - inspected_at) * rng.random() ** 2)
+                pending_pick = picked.setdefault((branch_id, product_id), [0, picked_at])
+                pending_pick[0] += quantity - remaining
+                pending_pick[1] = max(pending_pick[1], picked_at)
+                target = order_sizes.setdefault((branch_id, product_id), max(1, int(rng.expovariate(1 / MEAN_OUTBOUND_QUANTITY))))
+                if pending_pick[0] >= target:
+                    outbound_writer.add((product_id, pending_pick[0], rng.choice(users_by_branch[branch_id]), branch_id, pending_pick[1]))
+                    del picked[(branch_id, product_id)], order_sizes[(branch_id, product_id)]
+            lot_writer.add((product_id, branch_id, next_order_id, remaining, status, created_at, inspected_at, receiver_id))
+
+        order_writer.add((next_order_id, product_id, order_quantity, receiver_id, branch_id, created_at))
+        next_order_id += 1
+        lot_index += lot_count
+        if lot_writer.written != reported:
+            reported = lot_writer.written
+            print(f"  {reported}/{lots} lots")
+
+    for (branch_id, product_id), (quantity, picked_at) in picked.items():
+        outbound_writer.add((product_id, quantity, rng.choice(users_by_branch[branch_id]), branch_id, picked_at))
+    lot_writer.flush()
+    outbound_writer.flush()
+    finish_inbound_order_ids(db)
+
+    # Lots get their ledger history as opening movements, then the balances are derived from them.
+    ledger.backfill_opening_movements(db)
+    stock_balance.rebuild(db)
+    return {
+        "branches": len(branch_ids),
+        "users": users,
+        "products": len(branch_ids) * products,
+        "inbound_orders": order_writer.written,
+        "stock_lots": lot_writer.written,
+        "outbound_orders": outbound_writer.written,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the database with a deterministic, skewed synthetic dataset for scale tests.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="synthetic", help="Names of generated branches, users and SKUs start with this")
+    parser.add_argument("--branches", type=int, default=10)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--products", type=int, default=1000, help="SKUs per branch")
+    parser.add_argument("--lots", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365, help="Days of receipt history")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, help="End of the history (default: today 00:00 UTC)")
+    parser.add_argument("--replace", action="store_true", help="Delete a dataset with the same prefix first")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.replace:
+            drop(db, args.prefix)
+        elif dataset_branch_ids(db, args.prefix):
+            raise SystemExit(f"A '{args.prefix}' dataset already exists; pass --replace to regenerate it.")
+        print(f"Generating {args.lots} lots (seed {args.seed})...")
+        started = time.perf_counter()
+        counts = generate(
+            db, seed=args.seed, prefix=args.prefix, branches=args.branches, users=args.users,
+            products=args.products, lots=args.lots, days=args.days, as_of=args.as_of,
+        )
+        db.commit()
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("ANALYZE")) # Fresh planner statistics for the measurements that follow
+            db.commit()
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+        print(f"Done in {time.perf_counter() - started:.1f}s. Users log in as {user_email(args.prefix, 0)} / {DEFAULT_PASSWORD}.")
+    finally:
+        db.close()
@@ -0,0 +1,29 @@
+import argparse
+
+from .core.database import SessionLocal
+from .core import ledger, snapshots
+
+def take(if_due: float = 0) -> bool:
+    """
+    Takes an inventory snapshot; with `if_due`, only if none was taken in the
+    last `if_due` seconds. Returns whether a snapshot was taken.
+    """
+    db = SessionLocal()
+    try:
+        snapshot = snapshots.take_snapshot_if_due(db, if_due) if if_due else ledger.take_snapshot(db)
+        db.commit()
+        if snapshot is None:
+            print("A recent snapshot exists, nothing to do.")
+            return False
+        print(f"Snapshot {snapshot.id} taken up to ledger movement {snapshot.last_movement_id}.")
+        return True
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write an inventory snapshot (per branch, product and status), e.g. from cron.")
+    parser.add_argument("--if-due", type=float, default=0, metavar="SECONDS", help="Skip if a snapshot is younger than this")
+    args = parser.parse_args()
+
+    print("Taking inventory snapshot...")
+    take(if_due=args.if_due)
@@ -0,0 +1,240 @@
+"""
+Stress test: N parallel pickers draining the same SKU.
+
+Seeds one SKU with a pool of AVAILABLE lots (committed, since the pickers use
+their own connections) and starts `--workers` threads. Each one repeatedly picks
+`--pick-quantity` units the way `create_outbound_order` does (lock lots, write the
+allocation, insert the order, record the ledger movements, commit) until the SKU runs out.
+
+Afterwards it checks correctness:
+- units picked + units left == units seeded, with less than one pick left;
+- every committed pick has its order and PICK movements, and no lot went negative;
+- the AVAILABLE balance matches the lots.
+It reports throughput for SKIP LOCKED picking and, with `--compare`, for plain
+blocking FOR UPDATE.
+
+SKIP LOCKED spreads the lot locks. Every pick also upserts the (product, branch,
+AVAILABLE) stock balance through ledger.record and holds that row lock until it
+commits; the balance is spread over STOCK_BALANCE_SHARDS rows picked by connection,
+so pickers only queue there when they share a shard. The time from recording the
+movements to the end of the commit is reported separately as the balance write
+time. Everything seeded is deleted at the end. Requires
+DATABASE_URL to point at a PostgreSQL database with the WMS tables created
+(see app/initial_data.py) and a connection pool of at least `--workers`.
+
+    python -m benchmarks.concurrent_picking --workers 16 --lots 2000 --compare
+"""
+import argparse
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, insert, select
+
+from app.core import ledger, models, picking, stock_balance
+from app.core.database import SessionLocal
+
+stock_lots = models.StockLot.__table__
+
+# --- Helper Functions ---
+
+def print_step(message):
+    print(f"\n--- {message} ---")
+
+
+def seed_sku(lot_count: int, lot_quantity: int):
+    """Creates a branch, user, product and its AVAILABLE lots; returns (user_id, product_id, branch_id)."""
+    db = SessionLocal()
+    try:
+        suffix = time.time_ns()
+        branch = models.Branch(name=f"stress-branch-{suffix}")
+        user = models.User(email=f"stress-{suffix}@example.com", hashed_password="x", branches=[branch])
+        product = models.Product(name=f"stress-product-{suffix}", branch=branch)
+        db.add_all([branch, user, product])
+        db.flush()
+        inbound = models.InboundOrder(
+            product_id=product.id, quantity=lot_count * lot_quantity,
+            user_id=user.id, branch_id=branch.id,
+        )
+        db.add(inbound)
+        db.flush()
+
+        start = datetime.now(timezone.utc) - timedelta(days=30)
+        db.execute(
+            insert(stock_lots),
+            [
+                {
+                    "product_id": product.id,
+                    "branch_id": branch.id,
+                    "inbound_order_id": inbound.id,
+                    "quantity": lot_quantity,
+                    "status": models.StockLotStatus.AVAILABLE,
+                    "created_at": start + timedelta(seconds=i),
+                    "created_by_user_id": user.id,
+                }
+                for i in range(lot_count)
+            ],
+        )
+        stock_balance.apply_delta(
+            db, product.id, branch.id, models.StockLotStatus.AVAILABLE, lot_count * lot_quantity
+        )
+        db.commit()
+        return user.id, product.id, branch.id
+    finally:
+        db.close()
+
+
+def cleanup(user_id: int, product_id: int, branch_id: int):
+    db = SessionLocal()
+    try:
+        db.execute(delete(models.InventoryMovement.__table__).where(models.InventoryMovement.product_id == product_id))
+        db.execute(delete(stock_lots).where(stock_lots.c.product_id == product_id))
+        db.execute(delete(models.OutboundOrder.__table__).where(models.OutboundOrder.product_id == product_id))
+        db.execute(delete(models.InboundOrder.__table__).where(models.InboundOrder.product_id == product_id))
+        db.execute(delete(models.StockBalance.__table__).where(models.StockBalance.product_id == product_id))
+        db.execute(delete(models.Product.__table__).where(models.Product.id == product_id))
+        db.delete(db.get(models.User, user_id))
+        db.flush()
+        db.execute(delete(models.Branch.__table__).where(models.Branch.id == branch_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def picker(user_id, product_id, branch_id, quantity, skip_locked, start, results, lock):
+    """
+    Picks until the SKU is exhausted, recording the latency of each committed pick
+    and how much of it was spent recording the movements and committing.
+    """
+    db = SessionLocal()
+    latencies = []
+    balance_waits = []
+    failures = 0
+    start.wait()
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                allocations = picking.allocate_fifo(db, product_id, branch_id, quantity, skip_locked=skip_locked)
+            except picking.InsufficientStock:
+                db.rollback()
+                break
+            except Exception:
+                # Serialization or deadlock errors would show up here; count them.
+                db.rollback()
+                failures += 1
+                if failures >= 50:
+                    raise
+                continue
+            order = models.OutboundOrder(product_id=product_id, quantity=quantity, user_id=user_id, branch_id=branch_id)
+            db.add(order)
+            db.flush()
+            recording = time.perf_counter()
+            # Upserts this connection's shard of the AVAILABLE balance
+            ledger.record(db, ledger.pick_movements(allocations, product_id, branch_id, user_id, order.id))
+            db.commit()
+            finished = time.perf_counter()
+            latencies.append((finished - started) * 1000)
+            balance_waits.append((finished - recording) * 1000)
+    finally:
+        db.close()
+        with lock:
+            results["latencies"].extend(latencies)
+            results["balance_waits"].extend(balance_waits)
+            results["failures"] += failures
+
+
+def verify(product_id: int, branch_id: int, seeded: int, pick_quantity: int, latencies) -> bool:
+    db = SessionLocal()
+    try:
+        remaining = db.scalar(select(func.coalesce(func.sum(stock_lots.c.quantity), 0)).where(stock_lots.c.product_id == product_id))
+        negative = db.scalar(select(func.count()).where(stock_lots.c.product_id == product_id, stock_lots.c.quantity < 0))
+        ordered = db.scalar(
+            select(func.coalesce(func.sum(models.OutboundOrder.quantity), 0)).where(models.OutboundOrder.product_id == product_id)
+        )
+        ledger_picked = -db.scalar(
+            select(func.coalesce(func.sum(models.InventoryMovement.quantity), 0)).where(
+                models.InventoryMovement.product_id == product_id,
+                models.InventoryMovement.movement_type == models.MovementType.PICK,
+            )
+        )
+        balance = stock_balance.get_quantity(db, product_id, branch_id, models.StockLotStatus.AVAILABLE)
+    finally:
+        db.close()
+
+    picked = len(latencies) * pick_quantity
+    checks = [
+        ("units picked + left in lots == units seeded", picked + remaining == seeded),
+        ("left in lots is below one pick", remaining < pick_quantity),
+        ("ordered units == units picked", ordered == picked),
+        ("PICK movements == units picked", ledger_picked == picked),
+        ("no lot went negative", negative == 0),
+        ("AVAILABLE balance == lots", balance == remaining),
+    ]
+    for label, passed in checks:
+        print(f"[{' OK ' if passed else 'FAIL'}] {label}")
+    return all(passed for _, passed in checks)
+
+
+# --- Stress Test ---
+
+def p95(sorted_values):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * 0.95))]
+
+
+def run_scenario(label, workers, lot_count, lot_quantity, pick_quantity, skip_locked) -> bool:
+    print_step(f"{label}: {workers} pickers, {lot_count} lots of {lot_quantity}, {pick_quantity} units per pick")
+    user_id, product_id, branch_id = seed_sku(lot_count, lot_quantity)
+    try:
+        results = {"latencies": [], "balance_waits": [], "failures": 0}
+        lock = threading.Lock()
+        start = threading.Event()
+        threads = [
+            threading.Thread(
+                target=picker,
+                args=(user_id, product_id, branch_id, pick_quantity, skip_locked, start, results, lock),
+            )
+            for _ in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        start.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(results["latencies"])
+        if latencies:
+            balance_waits = sorted(results["balance_waits"])
+            print(
+                f"{len(latencies)} picks in {elapsed:.2f}s = {len(latencies) / elapsed:.1f} picks/s; "
+                f"latency median {statistics.median(latencies):.1f} ms, p95 {p95(latencies):.1f} ms; "
+                f"{results['failures']} failed attempt(s)"
+            )
+            print(
+                f"balance write (ledger record + commit) median {statistics.median(balance_waits):.1f} ms, "
+                f"p95 {p95(balance_waits):.1f} ms; {sum(balance_waits) / sum(latencies):.0%} of pick time "
+                f"over {stock_balance.STOCK_BALANCE_SHARDS} balance shard(s)"
+            )
+        return verify(product_id, branch_id, lot_count * lot_quantity, pick_quantity, latencies) and not results["failures"]
+    finally:
+        cleanup(user_id, product_id, branch_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--lots", type=int, default=1000)
+    parser.add_argument("--lot-quantity", type=int, default=10)
+    parser.add_argument("--pick-quantity", type=int, default=7, help="Not a multiple of the lot quantity, so picks split lots")
+    parser.add_argument("--compare", action="store_true", help="Also run with blocking FOR UPDATE")
+    args = parser.parse_args()
+
+    scenarios = [("SKIP LOCKED", True)] + ([("FOR UPDATE (blocking)", False)] if args.compare else [])
+    ok = all([
+        run_scenario(label, args.workers, args.lots, args.lot_quantity, args.pick_quantity, skip_locked)
+        for label, skip_locked in scenarios
+    ])
+    raise SystemExit(0 if ok else 1)
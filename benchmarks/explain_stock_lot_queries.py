@@ -0,0 +1,154 @@
+"""
+Query-plan check for the stock lot hot paths.
+
+Seeds a realistic spread of lots (many SKUs and branches, mostly AVAILABLE,
+a few PENDING/QUARANTINED) inside a transaction that is rolled back, runs
+ANALYZE, then EXPLAINs the statements issued by FIFO picking and the quality
+dashboard. Exits non-zero if any of them reads stock_lots with a sequential
+scan. Requires DATABASE_URL to point at a PostgreSQL database with the WMS
+tables and indexes created (see app/initial_data.py and alembic).
+
+    python -m benchmarks.explain_stock_lot_queries --lots 50000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.core import models, picking
+from app.core.database import engine
+
+stock_lots = models.StockLot.__table__
+
+# --- Helper Functions ---
+
+def print_step(message):
+    print(f"\n--- {message} ---")
+
+
+def seed(connection, lot_count: int, products: int, branches: int):
+    """Seeds `lot_count` lots spread over `products` x `branches`; returns (product_ids, branch_ids)."""
+    rng = random.Random(42)
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as db:
+        suffix = time.time_ns()
+        branch_objs = [models.Branch(name=f"explain-branch-{suffix}-{i}") for i in range(branches)]
+        user = models.User(email=f"explain-{suffix}@example.com", hashed_password="x", branches=branch_objs)
+        product_objs = [
+            models.Product(name=f"explain-product-{suffix}-{i}", branch=branch_objs[i % branches])
+            for i in range(products)
+        ]
+        db.add_all(branch_objs + product_objs + [user])
+        db.flush()
+        inbound = models.InboundOrder(
+            product_id=product_objs[0].id, quantity=1, user_id=user.id, branch_id=branch_objs[0].id,
+        )
+        db.add(inbound)
+        db.flush()
+
+        statuses = [models.StockLotStatus.AVAILABLE] * 90 + [models.StockLotStatus.PENDING] * 7 + [models.StockLotStatus.QUARANTINED] * 3
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        db.execute(
+            insert(stock_lots),
+            [
+                {
+                    "product_id": rng.choice(product_objs).id,
+                    "branch_id": rng.choice(branch_objs).id,
+                    "inbound_order_id": inbound.id,
+                    "quantity": rng.randint(1, 50),
+                    "status": rng.choice(statuses),
+                    "created_at": start + timedelta(seconds=i),
+                    "created_by_user_id": user.id,
+                }
+                for i in range(lot_count)
+            ],
+        )
+        db.commit()
+        return [p.id for p in product_objs], [b.id for b in branch_objs]
+
+
+def hot_path_statements(product_id: int, branch_id: int):
+    """
+    The stock lot statements issued by picking.py and quality.py, by name.
+    Batch picks lock each product with the same chunked statement as single picks.
+    """
+    pending = select(stock_lots).where(stock_lots.c.status == models.StockLotStatus.PENDING)
+    fifo = (stock_lots.c.created_at, stock_lots.c.id)
+    return {
+        "fifo pick, single statement (outbound)": picking.build_fifo_pick(product_id, branch_id, 10),
+        "fifo pick lock chunk (outbound)": picking.build_lot_lock(
+            [product_id], branch_id, limit=picking.PICK_LOCK_CHUNK_SIZE
+        ),
+        "fifo pick next chunk (outbound)": picking.build_lot_lock(
+            [product_id], branch_id, after=(datetime.now(timezone.utc) - timedelta(days=180), 0),
+            limit=picking.PICK_LOCK_CHUNK_SIZE,
+        ),
+        "pending lots, all branches (admin)": pending.order_by(*fifo).limit(100),
+        "pending lots, user branches": (
+            pending.where(stock_lots.c.branch_id.in_([branch_id])).order_by(*fifo).limit(100)
+        ),
+        "pending lots, keyset page": (
+            pending.where(tuple_(*fifo) > (datetime.now(timezone.utc) - timedelta(days=180), 0))
+            .order_by(*fifo)
+            .limit(100)
+        ),
+    }
+
+
+def explain(connection, statement) -> dict:
+    compiled = statement.compile(connection, compile_kwargs={"render_postcompile": True})
+    plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def stock_lot_scans(node: dict):
+    """Yields (node type, index name) for every plan node that reads stock_lots."""
+    if node.get("Relation Name") == "stock_lots":
+        yield node["Node Type"], node.get("Index Name")
+    for child in node.get("Plans", []):
+        yield from stock_lot_scans(child)
+
+
+# --- Check ---
+
+def run_check(lot_count: int, products: int, branches: int) -> int:
+    failures = 0
+    with engine.connect() as connection:
+        outer = connection.begin()
+        try:
+            print_step(f"Seeding {lot_count} lots over {products} products and {branches} branches")
+            product_ids, branch_ids = seed(connection, lot_count, products, branches)
+            connection.execute(text("ANALYZE stock_lots"))
+
+            statements = hot_path_statements(product_ids[0], branch_ids[0])
+            print_step("Query plans")
+            for name, statement in statements.items():
+                scans = list(stock_lot_scans(explain(connection, statement)))
+                sequential = [scan for scan in scans if scan[0] == "Seq Scan"]
+                failures += bool(sequential)
+                described = ", ".join(f"{node_type} ({index})" if index else node_type for node_type, index in scans)
+                print(f"[{'FAIL' if sequential else ' OK '}] {name}: {described or 'no stock_lots access'}")
+        finally:
+            outer.rollback()
+
+    if failures:
+        print(f"\n{failures} hot-path quer{'y' if failures == 1 else 'ies'} regressed to a sequential scan on stock_lots.")
+    else:
+        print("\nAll hot-path queries use an index on stock_lots.")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=50000)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--branches", type=int, default=5)
+    args = parser.parse_args()
+
+    sys.exit(1 if run_check(args.lots, args.products, args.branches) else 0)
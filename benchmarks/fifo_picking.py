@@ -0,0 +1,161 @@
+"""
+Benchmark: legacy per-lot FIFO loop vs. the picking engine.
+
+Compares three ways of picking:
+- legacy loop: the SUM query plus per-lot ORM loop the endpoint used before;
+- set-based pick: picking.allocate_fifo, which serves a pick covered by the
+  first chunk of lots with one window-function statement (pick_first_chunk);
+- chunked locks: the lock_fifo_lots path allocate_fifo falls back to for larger
+  or contended picks (lock chunks, plan in Python, one bulk UPDATE).
+Keep `--lots-per-pick` at or below PICK_LOCK_CHUNK_SIZE, or the set-based pick
+falls back too.
+
+Seeds one SKU with N AVAILABLE lots per scenario (10, 1k and 100k by default)
+inside a transaction that is rolled back at the end, so the target database is
+left untouched. Requires DATABASE_URL to point at a PostgreSQL database with
+the WMS tables created (see app/initial_data.py).
+
+    python -m benchmarks.fifo_picking --sizes 10,1000,100000 --repeat 5
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.core import models, picking
+from app.core.database import engine
+
+# --- Helper Functions ---
+
+def print_step(message):
+    print(f"\n--- {message} ---")
+
+
+def legacy_pick(db: Session, product_id: int, branch_id: int, quantity: int):
+    """The picking loop `create_outbound_order` used before the picking engine."""
+    total_available = db.query(func.sum(models.StockLot.quantity)).filter(
+        models.StockLot.product_id == product_id,
+        models.StockLot.branch_id == branch_id,
+        models.StockLot.status == models.StockLotStatus.AVAILABLE
+    ).scalar() or 0
+    if total_available < quantity:
+        raise picking.InsufficientStock(available=total_available, requested=quantity)
+
+    available_lots = db.query(models.StockLot).filter(
+        models.StockLot.product_id == product_id,
+        models.StockLot.branch_id == branch_id,
+        models.StockLot.status == models.StockLotStatus.AVAILABLE
+    ).order_by(models.StockLot.created_at.asc()).all()
+
+    quantity_to_pick = quantity
+    for lot in available_lots:
+        if quantity_to_pick <= 0: break
+        picked_from_this_lot = min(lot.quantity, quantity_to_pick)
+        lot.quantity -= picked_from_this_lot
+        quantity_to_pick -= picked_from_this_lot
+        if lot.quantity == 0:
+            db.delete(lot)
+        else:
+            db.add(lot)
+    db.flush()
+
+
+def engine_pick(db: Session, product_id: int, branch_id: int, quantity: int):
+    picking.allocate_fifo(db, product_id, branch_id, quantity)
+
+
+def chunked_pick(db: Session, product_id: int, branch_id: int, quantity: int):
+    lots, _ = picking.lock_fifo_lots(db, product_id, branch_id, quantity)
+    picking.write_allocations(db, picking.plan_fifo(lots, quantity))
+
+
+def seed_sku(connection, lot_count: int, lot_quantity: int):
+    """Creates a branch, user, product and `lot_count` AVAILABLE lots; returns (product_id, branch_id)."""
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as db:
+        suffix = f"{lot_count}-{time.time_ns()}"
+        branch = models.Branch(name=f"bench-branch-{suffix}")
+        user = models.User(email=f"bench-{suffix}@example.com", hashed_password="x", branches=[branch])
+        product = models.Product(name=f"bench-product-{suffix}", branch=branch)
+        db.add_all([branch, user, product])
+        db.flush()
+        inbound = models.InboundOrder(
+            product_id=product.id, quantity=lot_count * lot_quantity,
+            user_id=user.id, branch_id=branch.id,
+        )
+        db.add(inbound)
+        db.flush()
+
+        start = datetime.now(timezone.utc) - timedelta(days=365)
+        db.execute(
+            insert(models.StockLot.__table__),
+            [
+                {
+                    "product_id": product.id,
+                    "branch_id": branch.id,
+                    "inbound_order_id": inbound.id,
+                    "quantity": lot_quantity,
+                    "status": models.StockLotStatus.AVAILABLE,
+                    "created_at": start + timedelta(seconds=i),
+                    "created_by_user_id": user.id,
+                }
+                for i in range(lot_count)
+            ],
+        )
+        db.commit()
+        return product.id, branch.id
+
+
+def time_pick(connection, pick_fn, product_id, branch_id, quantity, repeat):
+    """Runs `pick_fn` `repeat` times, rolling each run back; returns timings in ms."""
+    timings = []
+    for _ in range(repeat):
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as db:
+            started = time.perf_counter()
+            pick_fn(db, product_id, branch_id, quantity)
+            timings.append((time.perf_counter() - started) * 1000)
+            db.rollback()
+    return timings
+
+
+# --- Benchmark ---
+
+def run_benchmark(sizes, repeat, lots_per_pick, lot_quantity):
+    results = []
+    with engine.connect() as connection:
+        outer = connection.begin()
+        try:
+            for size in sizes:
+                print_step(f"Seeding {size} lots")
+                product_id, branch_id = seed_sku(connection, size, lot_quantity)
+                quantity = min(size, lots_per_pick) * lot_quantity
+
+                strategies = (("legacy loop", legacy_pick), ("set-based pick", engine_pick), ("chunked locks", chunked_pick))
+                for label, pick_fn in strategies:
+                    timings = time_pick(connection, pick_fn, product_id, branch_id, quantity, repeat)
+                    results.append((size, label, statistics.median(timings), max(timings)))
+        finally:
+            outer.rollback()
+
+    print_step(f"Results (median / max over {repeat} runs, {lots_per_pick} lots consumed per pick)")
+    print(f"{'lots':>8}  {'strategy':<16}{'median ms':>12}{'max ms':>12}")
+    for size, label, median, worst in results:
+        print(f"{size:>8}  {label:<16}{median:>12.2f}{worst:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,100000", help="Comma separated lot counts per SKU")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lots-per-pick", type=int, default=5, help="How many lots each pick consumes")
+    parser.add_argument("--lot-quantity", type=int, default=10)
+    args = parser.parse_args()
+
+    run_benchmark(
+        sizes=[int(size) for size in args.sizes.split(",")],
+        repeat=args.repeat,
+        lots_per_pick=args.lots_per_pick,
+        lot_quantity=args.lot_quantity,
+    )
@@ -0,0 +1,307 @@
+"""
+Load test: concurrent inbound -> quality inspection -> outbound traffic.
+
+Seeds a skewed dataset with app/synthetic_data.py (`--branches`, `--users`,
+`--products` per branch, `--lots` over `--days` of history) and drives the app
+in process through httpx's ASGI transport, with `--concurrency` clients issuing
+a weighted mix of requests (mostly on the hot SKUs) for `--duration` seconds (after
+`--warmup` seconds that are not measured):
+
+- inbound.create   POST /wms/inbound/orders
+- quality.inspect  PUT  /api/quality/stock_lots/{id}   (PENDING lots, seeded or just received)
+- outbound.create  POST /wms/outbound/orders
+- quality.pending  GET  /api/quality/stock_lots/pending
+- inbound.list     GET  /wms/inbound/orders
+
+It reports requests per second and p50/p95/p99 latency per endpoint and can
+save them as JSON (`--output`). Given a previous result (`--baseline`), it
+flags endpoints whose p95 grew or whose throughput dropped by more than
+`--tolerance` and exits non-zero, so regressions are caught before deploy.
+
+The dataset is kept between runs so runs stay comparable. Its names carry the
+generation parameters (`loadtest-s42-b4-...`), so a dataset seeded with other
+parameters is never reused: the run stops unless `--reseed` replaces it. Requires DATABASE_URL to point at a
+PostgreSQL database with the WMS tables created (see app/initial_data.py).
+
+    python -m benchmarks.load_test --products 2000 --lots 1000000 --concurrency 32 --duration 60 --output run.json
+    python -m benchmarks.load_test --duration 60 --baseline run.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import select
+
+from app import synthetic_data
+from app.core import models
+from app.core.database import SessionLocal
+
+PREFIX = "loadtest"
+ADMIN_PASSWORD = synthetic_data.DEFAULT_PASSWORD
+
+# (operation, weight) of the traffic mix
+OPERATIONS = [
+    ("inbound.create", 3),
+    ("quality.inspect", 3),
+    ("outbound.create", 3),
+    ("quality.pending", 1),
+    ("inbound.list", 1),
+]
+
+# --- Helper Functions ---
+
+def print_step(message):
+    print(f"\n--- {message} ---")
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# --- Dataset ---
+
+def dataset_prefix(args) -> str:
+    """Prefix of the dataset generated with these arguments."""
+    return f"{PREFIX}-s{args.seed}-b{args.branches}-u{args.users}-p{args.products}-l{args.lots}-d{args.days}"
+
+
+def seeded_prefixes(db):
+    """Prefixes of the load test datasets in the database."""
+    suffix = synthetic_data.branch_name("", 0)
+    names = db.scalars(select(models.Branch.name).where(models.Branch.name.like(f"{PREFIX}%{suffix}")))
+    return [name[:-len(suffix)] for name in names]
+
+
+def load_dataset(db, prefix: str):
+    """Returns (branch_ids, {branch_id: [product_ids by popularity]}) of a dataset."""
+    branch_ids = synthetic_data.dataset_branch_ids(db, prefix)
+    products = defaultdict(list)
+    for product_id, branch_id in db.execute(
+        select(models.Product.id, models.Product.branch_id)
+        .where(models.Product.branch_id.in_(branch_ids))
+        .order_by(models.Product.id) # Generated in popularity order
+    ):
+        products[branch_id].append(product_id)
+    return list(branch_ids), dict(products)
+
+
+def prepare_dataset(args, prefix: str):
+    db = SessionLocal()
+    try:
+        existing = seeded_prefixes(db)
+        if not args.reseed:
+            if prefix in existing:
+                print(f"Reusing the dataset already seeded as {prefix}; pass --reseed to replace it.")
+                return load_dataset(db, prefix)
+            if existing:
+                raise SystemExit(
+                    f"The load test dataset was seeded with other parameters ({', '.join(existing)}); "
+                    f"pass --reseed to replace it with {prefix}."
+                )
+        for stale in existing:
+            synthetic_data.drop(db, stale)
+        counts = synthetic_data.generate(
+            db, seed=args.seed, prefix=prefix, branches=args.branches, users=args.users,
+            products=args.products, lots=args.lots, days=args.days,
+        )
+        db.commit()
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+        return load_dataset(db, prefix)
+    finally:
+        db.close()
+
+
+def pending_lot_ids(branch_ids, limit: int):
+    db = SessionLocal()
+    try:
+        return db.scalars(
+            select(models.StockLot.id)
+            .where(models.StockLot.branch_id.in_(branch_ids), models.StockLot.status == models.StockLotStatus.PENDING)
+            .order_by(models.StockLot.id)
+            .limit(limit)
+        ).all()
+    finally:
+        db.close()
+
+# --- Traffic ---
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def observe(self, operation: str, status_code: int, seconds: float):
+        if self.recording:
+            self.latencies[operation].append(seconds * 1000)
+            self.statuses[operation][status_code] += 1
+
+
+async def run_operation(client, operation, rng, branch_ids, products, sku_weights, pending):
+    """Issues one request; returns (operation actually run, status code)."""
+    branch_id = rng.choice(branch_ids)
+    product_id = products[branch_id][synthetic_data.pick(rng, sku_weights)]
+    if operation == "quality.inspect" and not pending:
+        operation = "inbound.create" # Nothing left to inspect; receive more instead
+
+    if operation == "inbound.create":
+        response = await client.post("/wms/inbound/orders", json={
+            "product_id": product_id, "quantity": rng.randint(1, 100), "branch_id": branch_id,
+        })
+        if response.status_code == 200:
+            pending.extend(lot["id"] for lot in response.json()["stock_lots"])
+    elif operation == "quality.inspect":
+        lot_id = pending.pop(rng.randrange(len(pending)))
+        target = "available" if rng.random() < 0.9 else "quarantined"
+        response = await client.put(f"/api/quality/stock_lots/{lot_id}", json={"status": target})
+    elif operation == "outbound.create":
+        response = await client.post("/wms/outbound/orders", json={
+            "product_id": product_id, "quantity": rng.randint(1, 20), "branch_id": branch_id,
+        })
+    elif operation == "quality.pending":
+        response = await client.get("/api/quality/stock_lots/pending", params={"limit": 50})
+    else:
+        response = await client.get("/wms/inbound/orders", params={"limit": 50})
+    return operation, response.status_code
+
+
+async def client_loop(client, recorder, rng, deadline, branch_ids, products, sku_weights, pending):
+    names = [name for name, _ in OPERATIONS]
+    weights = [weight for _, weight in OPERATIONS]
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        operation, status_code = await run_operation(client, rng.choices(names, weights)[0], rng, branch_ids, products, sku_weights, pending)
+        recorder.observe(operation, status_code, time.perf_counter() - started)
+
+
+async def drive(args, admin_email, branch_ids, products, pending):
+    from app.main import app
+
+    recorder = Recorder()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            token = await client.post("/auth/token", data={"username": admin_email, "password": ADMIN_PASSWORD})
+            token.raise_for_status()
+            client.headers["Authorization"] = f"Bearer {token.json()['access_token']}"
+
+            started = time.perf_counter()
+            deadline = started + args.warmup + args.duration
+            rngs = [random.Random(args.seed * 1000 + i) for i in range(args.concurrency)]
+            sku_weights = synthetic_data.zipf_cum_weights(min(map(len, products.values())), synthetic_data.SKU_SKEW)
+            clients = [
+                asyncio.create_task(client_loop(client, recorder, rngs[i], deadline, branch_ids, products, sku_weights, pending))
+                for i in range(args.concurrency)
+            ]
+            await asyncio.sleep(args.warmup)
+            recorder.recording = True
+            measured_from = time.perf_counter()
+            await asyncio.gather(*clients)
+            elapsed = time.perf_counter() - measured_from
+    return recorder, elapsed
+
+# --- Reporting ---
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    results = {}
+    for operation in sorted(recorder.latencies):
+        latencies = sorted(recorder.latencies[operation])
+        statuses = recorder.statuses[operation]
+        results[operation] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+            "server_errors": sum(count for code, count in statuses.items() if code >= 500),
+            "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        }
+    return results
+
+
+def print_results(results: dict):
+    print(f"{'endpoint':<18}{'requests':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'5xx':>6}  statuses")
+    for operation, result in results.items():
+        print(
+            f"{operation:<18}{result['requests']:>10}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+            f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['server_errors']:>6}  {result['statuses']}"
+        )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Prints the change against a baseline run; False if any endpoint regressed beyond the tolerance."""
+    ok = True
+    for operation, result in results.items():
+        before = baseline["results"].get(operation)
+        if before is None:
+            continue
+        p95_change = result["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        rps_change = result["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        ok = ok and not regressed
+        print(f"[{'FAIL' if regressed else ' OK '}] {operation:<18} p95 {p95_change:+.1%}  rps {rps_change:+.1%}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--products", type=int, default=1000, help="Products per branch")
+    parser.add_argument("--lots", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365, help="Days of receipt history")
+    parser.add_argument("--reseed", action="store_true", help="Replace the existing load test dataset, whatever its parameters")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of traffic before measuring")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the dataset and the traffic mix")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed p95 growth / rps drop against the baseline")
+    args = parser.parse_args()
+
+    print_step(f"Dataset: {args.branches} branches x {args.products} products, {args.lots} lots")
+    prefix = dataset_prefix(args)
+    branch_ids, products = prepare_dataset(args, prefix)
+    pending = list(pending_lot_ids(branch_ids, limit=100000))
+    print(f"{len(pending)} PENDING lots available for inspection")
+
+    print_step(f"Traffic: {args.concurrency} clients, {args.warmup:g}s warmup + {args.duration:g}s measured")
+    recorder, elapsed = asyncio.run(drive(args, synthetic_data.user_email(prefix, 0), branch_ids, products, pending))
+    results = summarize(recorder, elapsed)
+    print_results(results)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "reseed")},
+        "elapsed_seconds": round(elapsed, 3),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Results written to {args.output}")
+
+    ok = all(result["server_errors"] == 0 for result in results.values())
+    if args.baseline:
+        print_step(f"Comparison with {args.baseline} (tolerance {args.tolerance:.0%})")
+        with open(args.baseline) as baseline_file:
+            ok = compare(results, json.load(baseline_file), args.tolerance) and ok
+    raise SystemExit(0 if ok else 1)